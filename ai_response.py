@@ -0,0 +1,49 @@
+"""
+AI reply parsing for AI Terminal Desktop
+"""
+
+import functools
+import re
+
+# Fields of the "COMMAND: ... / RESPONSE: ..." format the AI is asked to reply in.
+# A field line may be indented; the last COMMAND: and the last RESPONSE: win.
+# A response runs until the next field line or the end of the text.
+_COMMAND_RE = re.compile(r'^[ \t]*COMMAND:(.*)$', re.MULTILINE)
+_RESPONSE_RE = re.compile(
+    r'^[ \t]*RESPONSE:(.*?)(?:\n(?=[ \t]*(?:COMMAND|RESPONSE):)|\Z)',
+    re.MULTILINE | re.DOTALL)
+_FIELD_RE = re.compile(r'^[ \t]*(?:COMMAND|RESPONSE):', re.MULTILINE)
+
+
+def _field_value(text, field):
+    """Value of a field line, with any repeated field marker removed"""
+    return text.replace(field, "").strip()
+
+
+def _response_value(block):
+    """First line of a RESPONSE block is trimmed; continuation lines are kept as-is"""
+    first, sep, rest = block.partition("\n")
+    return _field_value(first, "RESPONSE:") + sep + rest
+
+
+@functools.lru_cache(maxsize=256)
+def parse_ai_response(response):
+    """Parse AI response text into (command, ai_message); memoized per response"""
+    text = response.strip()
+
+    # Fast path: COMMAND: on the first line, RESPONSE: on the second and no
+    # further field lines
+    head = text.split("\n", 2)
+    if (len(head) >= 2 and head[0].startswith("COMMAND:")
+            and head[1].lstrip(" \t").startswith("RESPONSE:")
+            and (len(head) == 2 or not _FIELD_RE.search(head[2]))):
+        return (_field_value(head[0], "COMMAND:"),
+                _response_value("\n".join(head[1:]).lstrip(" \t")[9:]))
+
+    command = "NONE"
+    for command_match in _COMMAND_RE.finditer(text):
+        command = _field_value(command_match.group(1), "COMMAND:")
+    ai_message = ""
+    for response_match in _RESPONSE_RE.finditer(text):
+        ai_message = _response_value(response_match.group(1))
+    return command, ai_message
@@ -4,9 +4,209 @@ Executes commands locally without SSH
 """
 
 import subprocess
+import codecs
+import functools
 import os
+import queue
+import re
+import select
+import selectors
 import shlex
+import shutil
 import signal
+import threading
+import time
+
+# Seconds a cached completion result stays valid
+COMPLETION_TTL = 5
+
+# Words that complete to plain command or file names, with no path or shell
+# syntax; SSHClient uses the same test
+PLAIN_WORD_RE = re.compile(r'[\w.+-]+\Z')
+
+# Characters that need /bin/sh: operators, redirection, expansion, globbing, comments
+_SHELL_CHARS = frozenset(';|&<>$`\\*?~(){}[]!#\n')
+
+
+def _needs_shell(command):
+    """True if command uses shell syntax and so can't run as a plain argv"""
+    return not _SHELL_CHARS.isdisjoint(command)
+
+
+def _spawn_args(command):
+    """Return (args, shell) for subprocess: a plain argv when the command needs
+    no shell features and names an executable, so no /bin/sh is started;
+    otherwise the command string for shell=True"""
+    if not _needs_shell(command):
+        try:
+            argv = shlex.split(command)
+        except ValueError:
+            argv = None
+        # Builtins, paths, unknown commands and VAR=value prefixes are left to
+        # the shell, which also reports errors the way users expect
+        if argv and '=' not in argv[0] and '/' not in argv[0] and shutil.which(argv[0]):
+            return argv, False
+    return command, True
+
+
+def _builtin_echo(client, args):
+    """echo, with -n; other options are left to the shell"""
+    newline = True
+    if args[:1] == ['-n']:
+        newline = False
+        args = args[1:]
+    elif args and args[0].startswith('-'):
+        return None
+    return ' '.join(args) + ('\n' if newline else '')
+
+
+# Commands answered in Python without starting a process. Each takes
+# (client, args) and returns the output, or None to run the command normally
+_BUILTINS = {
+    'pwd': lambda client, args: None if args else client.current_directory + '\n',
+    'echo': _builtin_echo,
+    'true': lambda client, args: '',
+    'false': lambda client, args: '',
+    'exit': lambda client, args: '',
+    'clear': lambda client, args: None if args else '\x1b[H\x1b[2J',
+}
+
+
+# Seconds between checks of PATH for added or removed commands
+PATH_CACHE_TTL = 10
+
+
+class _PathCache:
+    """Command names for completion: PATH executables plus bash builtins and
+    keywords. PATH is checked at most every PATH_CACHE_TTL seconds and only
+    rescanned when it, or the mtime of one of its directories, has changed."""
+    
+    def __init__(self):
+        self.entries = ()  # Sorted command names
+        self.path = None
+        self.mtime_sum = None
+        self.builtins = None
+        self.last_check = None
+        self.lock = threading.Lock()
+    
+    def get(self):
+        """Return the sorted tuple of command names, refreshing it if due"""
+        with self.lock:
+            now = time.monotonic()
+            if self.last_check is None or now - self.last_check > PATH_CACHE_TTL:
+                self.last_check = now
+                self.refresh()
+            return self.entries
+    
+    def refresh(self):
+        """Rescan PATH if it or any of its directories changed since the last scan"""
+        path = os.environ.get('PATH', '')
+        directories = [d or '.' for d in path.split(os.pathsep)]
+        mtime_sum = 0.0
+        for directory in directories:
+            try:
+                mtime_sum += os.stat(directory).st_mtime
+            except OSError:
+                pass
+        if path == self.path and mtime_sum == self.mtime_sum:
+            return
+        
+        if self.builtins is None:
+            try:
+                result = subprocess.run(['bash', '-c', 'compgen -b -k'],
+                                        capture_output=True, text=True, timeout=2)
+                self.builtins = result.stdout.split()
+            except Exception:
+                self.builtins = []
+        
+        names = set(self.builtins)
+        for directory in directories:
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_file() and os.access(entry.path, os.X_OK):
+                                names.add(entry.name)
+                        except OSError:
+                            pass
+            except OSError:
+                pass
+        self.entries = tuple(sorted(names))
+        self.path = path
+        self.mtime_sum = mtime_sum
+
+
+_PATH_CACHE = _PathCache()
+
+
+class _CompgenShell:
+    """A long-lived bash that answers compgen queries over pipes, so a Tab press
+    costs one pipe round-trip instead of starting a new shell"""
+    
+    def __init__(self):
+        self.proc = None
+        self.lock = threading.Lock()
+        self.sentinel = f"__END_{os.getpid()}_{id(self)}__"
+    
+    def _start(self):
+        self.proc = subprocess.Popen(
+            ['bash', '--noprofile', '--norc'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+    
+    def _stop(self):
+        if self.proc is not None:
+            try:
+                self.proc.kill()
+                self.proc.wait()
+            except Exception:
+                pass
+            self.proc = None
+    
+    def query(self, partial_text, cwd, timeout=2):
+        """Return compgen -f -c output lines for partial_text, run in cwd"""
+        request = (f"cd -- {shlex.quote(cwd)} 2>/dev/null && "
+                   f"compgen -f -c -- {shlex.quote(partial_text)} 2>/dev/null; "
+                   f"echo {self.sentinel}\n").encode()
+        end = f"{self.sentinel}\n".encode()
+        with self.lock:
+            try:
+                if self.proc is None or self.proc.poll() is not None:
+                    self._start()
+                self.proc.stdin.write(request)
+                self.proc.stdin.flush()
+                
+                # Read until the sentinel line comes back
+                fd = self.proc.stdout.fileno()
+                data = bytearray()
+                deadline = time.monotonic() + timeout
+                while not data.endswith(end):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                        raise TimeoutError("compgen did not answer")
+                    chunk = os.read(fd, 65536)
+                    if not chunk:
+                        raise EOFError("compgen shell exited")
+                    data += chunk
+            except Exception:
+                # Start a fresh shell on the next query
+                self._stop()
+                raise
+        
+        output = data[:-len(end)].decode('utf-8', errors='replace')
+        return tuple(line.strip() for line in output.split('\n') if line.strip())
+
+
+_COMPGEN_SHELL = _CompgenShell()
+
+
+@functools.lru_cache(maxsize=128)
+def _compgen(partial_text, cwd, bucket):
+    """Run bash compgen for partial_text in cwd. bucket is a time slot that
+    makes cached results expire after COMPLETION_TTL seconds."""
+    return _COMPGEN_SHELL.query(partial_text, cwd)
 
 
 class LocalClient:
@@ -20,13 +220,15 @@ class LocalClient:
         self.current_directory = os.getcwd()
         return True, "Connected to local terminal"
     
-    def execute_command(self, command, output_callback=None, timeout=None):
+    def execute_command(self, command, output_callback=None, timeout=None, max_bytes=None):
         """Execute a command locally with optional streaming output
         
         Args:
             command: Command to execute
             output_callback: Optional callback function(text) called for each chunk of output
             timeout: Optional timeout in seconds (None = no timeout for streaming)
+            max_bytes: Optional cap on the output kept in non-streaming mode; the
+                rest is read and discarded, so the command still runs to the end
         
         Returns:
             (success, output) tuple
@@ -34,7 +236,8 @@ class LocalClient:
         try:
             # Check if this is a cd command
             command_stripped = command.strip()
-            if command_stripped.lower().startswith('cd '):
+            # Only the first two characters need case-folding, not the whole command
+            if command_stripped[:2].lower() == 'cd' and command_stripped[2:3] == ' ':
                 # Handle cd command specially
                 path = command_stripped[3:].strip()
                 if not path:
@@ -42,13 +245,15 @@ class LocalClient:
                 else:
                     path = os.path.expanduser(path)
                 
-                # Make path absolute if relative
+                # Make path absolute if relative, and resolve . and .. lexically
+                # like bash's cd does, so the new directory is known without getcwd()
                 if not os.path.isabs(path):
                     path = os.path.join(self.current_directory, path)
+                path = os.path.normpath(path)
                 
                 try:
                     os.chdir(path)
-                    self.current_directory = os.getcwd()
+                    self.current_directory = path
                     return True, ""
                 except FileNotFoundError:
                     return True, f"cd: {path}: No such file or directory"
@@ -57,14 +262,24 @@ class LocalClient:
                 except Exception as e:
                     return True, f"cd: {str(e)}"
             
+            # Simple builtins are answered without starting a process
+            output = self._run_builtin(command_stripped)
+            if output is not None:
+                if output_callback and output:
+                    output_callback(output)
+                return True, output
+            
             # For streaming mode with callback
             if output_callback:
                 return self._execute_streaming(command, output_callback)
             
             # Non-streaming mode (original behavior)
+            args, shell = _spawn_args(command)
+            if max_bytes is not None:
+                return True, self._run_capped(args, shell, timeout or 30, max_bytes)
             result = subprocess.run(
-                command,
-                shell=True,
+                args,
+                shell=shell,
                 cwd=self.current_directory,
                 capture_output=True,
                 text=True,
@@ -78,49 +293,147 @@ class LocalClient:
             
             return True, output or ""
         except subprocess.TimeoutExpired:
-            return False, "Command timed out (30 seconds)"
+            return False, f"Command timed out ({timeout or 30} seconds)"
         except Exception as e:
             return False, str(e)
     
+    def _run_builtin(self, command):
+        """Return the output of command if _BUILTINS can answer it, else None"""
+        if _needs_shell(command):
+            return None
+        try:
+            argv = shlex.split(command)
+        except ValueError:
+            return None
+        handler = _BUILTINS.get(argv[0]) if argv else None
+        return handler(self, argv[1:]) if handler else None
+    
+    def _run_capped(self, args, shell, timeout, max_bytes):
+        """Run a command and return its stdout followed by its stderr, cut to
+        max_bytes bytes. At most max_bytes of each stream is kept; anything past
+        that is read and dropped, so long output never stops the command."""
+        process = subprocess.Popen(
+            args,
+            shell=shell,
+            cwd=self.current_directory,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True  # Own process group, killed as a whole on timeout
+        )
+        out, err = bytearray(), bytearray()
+        buffers = {process.stdout.fileno(): out, process.stderr.fileno(): err}
+        deadline = time.monotonic() + timeout
+        try:
+            with selectors.DefaultSelector() as selector:
+                for fd in buffers:
+                    selector.register(fd, selectors.EVENT_READ)
+                # Both pipes are drained together until EOF so neither can fill
+                # up and block the command
+                while selector.get_map():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise subprocess.TimeoutExpired(args, timeout)
+                    for key, _ in selector.select(remaining):
+                        data = os.read(key.fd, 65536)
+                        if not data:
+                            selector.unregister(key.fd)
+                        elif len(buffers[key.fd]) < max_bytes:
+                            buffers[key.fd] += data
+            process.wait(max(deadline - time.monotonic(), 0))
+        except subprocess.TimeoutExpired:
+            self._kill_group(process)
+            process.wait()
+            raise
+        finally:
+            process.stdout.close()
+            process.stderr.close()
+        return (out + err)[:max_bytes].decode('utf-8', errors='replace')
+    
+    @staticmethod
+    def _kill_group(process):
+        """SIGKILL a process started with start_new_session, and its children"""
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    
     def _execute_streaming(self, command, output_callback):
         """Execute command with streaming output"""
         try:
             # Start process with unbuffered output
+            args, shell = _spawn_args(command)
             self.running_process = subprocess.Popen(
-                command,
-                shell=True,
+                args,
+                shell=shell,
                 cwd=self.current_directory,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,  # Line buffered
-                preexec_fn=os.setsid  # Create new process group for signal handling
+                bufsize=0,  # Raw pipe; read with os.read below
+                # New process group for signal handling; unlike preexec_fn=os.setsid
+                # this lets subprocess use its vfork/posix_spawn fast path
+                start_new_session=True
             )
             
-            all_output = []
+            process = self.running_process
+            # Chunks can end mid-character; the decoder carries partial bytes over
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            all_output = bytearray()  # Raw output, decoded once at the end
             
-            # Read output line by line
+            # A reader thread keeps the pipe drained however long the callback
+            # takes; chunks are handed over through the queue
+            chunks = queue.SimpleQueue()
+            threading.Thread(target=self._read_output, args=(process, chunks), daemon=True).start()
             try:
-                for line in iter(self.running_process.stdout.readline, ''):
-                    if line:
-                        all_output.append(line)
-                        output_callback(line)
-                    if self.running_process.poll() is not None:
-                        break
+                while (data := chunks.get()) is not None:
+                    all_output.extend(data)
+                    text = decoder.decode(data)
+                    if text:
+                        output_callback(text)
+                text = decoder.decode(b'', final=True)
+                if text:
+                    output_callback(text)
             except Exception:
                 pass
             
             # Wait for process to complete
-            self.running_process.wait()
-            return_code = self.running_process.returncode
+            process.wait()
+            return_code = process.returncode
             self.running_process = None
             
-            return True, ''.join(all_output)
+            return True, all_output.decode('utf-8', errors='replace')
             
         except Exception as e:
             self.running_process = None
             return False, str(e)
     
+    def _read_output(self, process, chunks):
+        """Put the process's output into chunks as it arrives, then None.
+        
+        Delivers output as soon as it reaches the pipe, newline or not. Stops at
+        EOF, or once the process has exited and the pipe is idle (a background
+        job may still hold it open).
+        """
+        try:
+            fd = process.stdout.fileno()
+            os.set_blocking(fd, False)
+            with selectors.DefaultSelector() as selector:
+                selector.register(fd, selectors.EVENT_READ)
+                while True:
+                    if selector.select(timeout=0.1):
+                        try:
+                            data = os.read(fd, 65536)
+                        except BlockingIOError:
+                            continue
+                        if not data:
+                            break  # EOF
+                        chunks.put(data)
+                    elif process.poll() is not None:
+                        break
+        except Exception:
+            pass
+        finally:
+            chunks.put(None)
+    
     def interrupt_command(self):
         """Send interrupt signal (Ctrl+C) to running command"""
         if self.running_process:
@@ -154,25 +467,19 @@ class LocalClient:
     def get_completions(self, partial_text):
         """Get bash tab completions for partial text"""
         try:
-            # Escape special characters
-            escaped_text = partial_text.replace("'", "'\\''")
+            cwd = self.current_directory
+            # Paths, ~user and shell syntax need bash; results are cached briefly
+            if not PLAIN_WORD_RE.match(partial_text):
+                return list(_compgen(partial_text, cwd, int(time.monotonic() // COMPLETION_TTL)))
             
-            # Use bash's compgen for completion
-            completion_cmd = f"bash -c \"compgen -f -c -- '{escaped_text}' 2>/dev/null\""
-            
-            result = subprocess.run(
-                completion_cmd,
-                shell=True,
-                cwd=self.current_directory,
-                capture_output=True,
-                text=True,
-                timeout=2
-            )
-            
-            if result.stdout:
-                completions = [line.strip() for line in result.stdout.split('\n') if line.strip()]
-                return completions
-            return []
+            # Plain words: match command names and files in cwd without spawning bash
+            completions = [c for c in _PATH_CACHE.get() if c.startswith(partial_text)]
+            seen = set(completions)
+            with os.scandir(cwd) as entries:
+                files = sorted(e.name for e in entries
+                               if e.name.startswith(partial_text) and e.name not in seen)
+            completions.extend(files)
+            return completions
         except Exception as e:
             return []
     
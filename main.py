@@ -10,12 +10,20 @@ gi.require_version('Adw', '1')
 from gi.repository import Gtk, Adw, GLib, Gio, Pango, Gdk
 import json
 import os
+import re
+import string
 import threading
-import datetime
-from ssh_client import SSHClient
+import time
+import concurrent.futures
+import copy
+import itertools
+from collections import deque
 from local_client import LocalClient
-from ollama_client import OllamaClient
+# SSHClient (paramiko) and OllamaClient (requests) are imported where first
+# used, on worker threads, to keep them off the startup path
 from settings_manager import SettingsManager
+from response_cache import ResponseCache
+from ai_response import parse_ai_response
 
 # Ensure the application's directory and the project root are on sys.path so
 # top-level modules like `config` can be imported when running from the
@@ -32,7 +40,240 @@ import config
 # Maximum number of characters to display from command output by default
 MAX_OUTPUT_CHARS = 150000
 
+# Maximum number of characters kept in the chat view; older messages are
+# dropped from the top so layout cost stays bounded in long sessions
+MAX_CHAT_BUFFER_CHARS = 2 * MAX_OUTPUT_CHARS
+
+# Appended to command output cut short by the max_output_chars setting
+_TRUNCATION_NOTE = ("\n\nNote: output was truncated by the 'Max Output Characters' setting. "
+                    "You can increase this limit in Settings "
+                    "(Settings → AI Personality → Max Output Characters) to see more output.")
+
+# Terminal control sequences (colors, cursor movement) stripped from command
+# output before it is shown in a text view
+_ANSI_RE = re.compile(r'\x1b\[[0-9;?]*[A-Za-z]')
+
+# Maximum number of messages kept in the AI conversation history
+MAX_HISTORY_MESSAGES = 32
+
+# Terminal-style dark theme, kept as bytes so GTK can parse it without
+# re-encoding a Python string for every window
+_CSS_BYTES = GLib.Bytes.new(b"""
+    window {
+        background-color: #000000;
+    }
+
+    .toolbar {
+        background-color: #1a1a1a;
+        border-top: 1px solid #333333;
+    }
+
+    textview {
+        background-color: #000000;
+        color: #00ff00;
+        font-family: 'Monospace', 'Courier New', monospace;
+        font-size: 13pt;
+        padding: 15px;
+    }
+
+    textview text {
+        background-color: #000000;
+        color: #00ff00;
+        caret-color: #00ff00;
+    }
+
+    entry {
+        background-color: #0a0a0a;
+        color: #00ff00;
+        border: 1px solid #333333;
+        border-radius: 2px;
+        padding: 10px;
+        font-family: 'Monospace', monospace;
+        caret-color: #00ff00;
+    }
+
+    entry:focus {
+        border-color: #00ff00;
+        box-shadow: 0 0 5px rgba(0, 255, 0, 0.3);
+    }
+
+    button {
+        background-color: #1a1a1a;
+        color: #00ff00;
+        border: 1px solid #333333;
+        border-radius: 2px;
+        padding: 8px 16px;
+        font-family: monospace;
+    }
+
+    button:hover {
+        background-color: #2a2a2a;
+        border-color: #00ff00;
+    }
+
+    button.suggested-action {
+        background-color: #003300;
+        border-color: #00ff00;
+    }
+
+    button.suggested-action:hover {
+        background-color: #005500;
+    }
+
+    .dim-label {
+        color: #00ff00;
+    }
+
+    headerbar {
+        background-color: #0a0a0a;
+        color: #00ff00;
+        border-bottom: 1px solid #333333;
+    }
+
+    separator {
+        background-color: #333333;
+    }
+
+    label {
+        color: #00ff00;
+    }
+
+    .title-2 {
+        color: #00ff00;
+        font-size: 16pt;
+        font-weight: bold;
+    }
+
+    /* Preferences window styling */
+    preferenceswindow {
+        background-color: #0a0a0a;
+    }
+
+    preferencespage {
+        background-color: #0a0a0a;
+    }
+
+    preferencesgroup {
+        background-color: #0a0a0a;
+    }
+
+    preferencesgroup > box {
+        background-color: #1a1a1a;
+        border: 1px solid #00ff00;
+        border-radius: 0px;
+        padding: 8px;
+    }
+
+    row {
+        background-color: #1a1a1a;
+        color: #00ff00;
+        border-radius: 0px;
+        padding: 4px;
+    }
+
+    row:hover {
+        background-color: #2a2a2a;
+    }
+
+    row entry {
+        background-color: #000000;
+        color: #00ff00;
+        border: 1px solid #00ff00;
+        border-radius: 0px;
+        padding: 8px;
+        font-family: monospace;
+    }
+
+    row entry:focus {
+        background-color: #0a0a0a;
+        border-color: #00ff00;
+        box-shadow: 0 0 3px rgba(0, 255, 0, 0.5);
+    }
+
+    combobox, dropdown {
+        background-color: #1a1a1a;
+        color: #00ff00;
+        border: none;
+        border-radius: 0px;
+    }
+
+    combobox button, dropdown button {
+        background-color: #1a1a1a;
+        border: none;
+        border-radius: 0px;
+    }
+
+    .title {
+        color: #00ff00;
+        font-weight: bold;
+    }
+
+    .subtitle {
+        color: #00aa00;
+    }
+
+    preferencesgroup > label {
+        color: #00ff00;
+        font-weight: bold;
+    }
+
+""")
+
+# Prompts sent to the model; only the $-placeholders change between requests
+_PROMPT = string.Template("""You are $ai_name, a $ai_role. YOU HAVE FULL SSH ACCESS TO THE SERVER and can run any command.
+$context
+
+A user has now requested: "$request_text"
+
+IMPORTANT INSTRUCTIONS:
+- You MUST respond in EXACTLY this format, with each line starting with the exact keywords below.
+- Do NOT use JSON, do NOT use code blocks, do NOT include any extra structured fields, and do NOT deviate from this format.
+- Each response must have these 2 lines:
+
+COMMAND: [If the user asks you to run something, write the single shell command to run. If no command is needed, write NONE]
+RESPONSE: [Your human-readable analysis or conversational reply]
+
+RESPONSE GUIDELINES (what to include in RESPONSE):
+- Give a concise (1-3 sentence) explanation of what the COMMAND will do, or provide a helpful conversational response.
+- If COMMAND is not NONE, briefly describe the *expected* output and how to interpret it (1-2 sentences).
+- Important: After the command is executed by the system, you will be asked to comment on the *actual* command output. Prepare your RESPONSE so it can be extended later: summarize what to look for in the output and what would indicate success vs. failure.
+- If the command could be destructive or risky (e.g., use of rm, dd, shutdown, usermod, etc.), include a one-line safety warning in the RESPONSE.
+- If there is no expected output or the command typically produces no output, include a short one-line humorous remark you would add later (e.g., "No news is good news — looks like it succeeded quietly.").
+- If no command is needed, engage in helpful conversation, provide information, or include jokes when appropriate.
+- Keep the RESPONSE polite, concise, and useful. Use plain text only.""")
+
+# Follow-up prompt asking the model to comment on the actual command output
+_ANALYSIS_PROMPT = string.Template("""You are $ai_name, a $ai_role. The command below was executed:
+$command
+
+The output produced was:
+$output
+
+In a concise (1-4 sentence) plain-text comment, do the following:
+- Summarize the most important information in the output.
+- If the output is empty or only whitespace, reply with a short light-hearted one-line joke and a confirmation that the command likely succeeded (or suggest a verification step).
+- If the output contains errors, point out the principal error lines and suggest a safe next step.
+- Do NOT include additional shell commands or structured data. Keep it helpful and to the point.
+""")
+
+
+def _ui(fn, *args, priority=GLib.PRIORITY_DEFAULT_IDLE):
+    """Run fn(*args) once on the default main context; safe from worker threads.
+    The source is attached explicitly so it never lands on a thread-default context."""
+    def dispatch(*_):
+        fn(*args)
+        return False  # One-shot
+    
+    source = GLib.idle_source_new()
+    source.set_priority(priority)
+    source.set_callback(dispatch)
+    source.attach(GLib.MainContext.default())
+
+
 class AITerminalWindow(Adw.ApplicationWindow):
+    # The CSS provider is registered for the display once, on first window
+    _css_registered = False
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         
@@ -44,15 +285,32 @@ class AITerminalWindow(Adw.ApplicationWindow):
         self.local_mode = True  # Start in local mode by default
         self.ollama_client = None
         self.settings_manager = SettingsManager()
-        self.conversation_history = []
+        self.ai_cache = ResponseCache()
+        # Shared workers for the short Ollama checks. SSH connects, commands and
+        # AI generation can run unbounded, so they get daemon threads instead:
+        # pool workers are joined at exit and would keep a closed app alive
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+        # (role, prompt line) pairs, rendered once when the message is added
+        self.conversation_history = deque(maxlen=MAX_HISTORY_MESSAGES)
+        self._history_version = 0  # Bumped on every history change
+        self._last_context = (-1, "")  # (history version, context string)
         # Command history for input navigation (new feature)
         self.command_history = []
         self.history_position = -1  # -1 means not currently navigating history
         self.current_input_text = ''
         self.saved_settings = {}
+        # Debounced settings writes happen on a timer thread: _pending_settings
+        # is a snapshot not yet on disk, guarded by _settings_lock
+        self._pending_settings = None
+        self._settings_timer = None
+        self._settings_lock = threading.Lock()
+        self._settings_write_lock = threading.Lock()  # Keeps writes in order
         self.ssh_servers = []  # List of saved SSH server configurations
+        self._servers_by_name = {}  # Name -> server config lookup for ssh_servers
+        self._server_rows = {}  # Name -> row index in the server selectors
         
         # Initialize entry references (will be created in settings dialog)
+        self._settings_dialog = None  # Built on first use by on_show_settings
         self.ssh_server_selector = None  # Dropdown for saved servers
         self.ssh_server_name_entry = None
         self.ssh_host_entry = None
@@ -61,9 +319,14 @@ class AITerminalWindow(Adw.ApplicationWindow):
         self.ssh_password_entry = None
         self.ollama_host_entry = None
         self.model_selector = None
+        self._model_rows = {}  # Model name -> row index in model_selector
         self.ai_name_entry = None
         self.ai_role_entry = None
         
+        # Chat widgets (created in create_main_content)
+        self.chat_view = None
+        self.chat_buffer = None
+        
         # Build UI
         self.build_ui()
         
@@ -80,176 +343,33 @@ class AITerminalWindow(Adw.ApplicationWindow):
         
         # Auto-connect to Ollama after a short delay
         GLib.timeout_add(500, self.auto_connect_ollama)
+        
+        # Write out any pending settings before the window goes away
+        self.connect("close-request", self._on_close_request)
+    
+    def _on_close_request(self, window):
+        """Flush pending settings and stop queued work on close"""
+        with self._settings_lock:
+            if self._settings_timer is not None:
+                self._settings_timer.cancel()
+                self._settings_timer = None
+        self._flush_settings_if_dirty()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.ai_cache.close()
+        return False  # Let the window close
     
     def build_ui(self):
         """Build the main UI"""
-        # Add CSS for terminal-style dark theme
-        css_provider = Gtk.CssProvider()
-        css_provider.load_from_string("""
-            window {
-                background-color: #000000;
-            }
-            
-            .toolbar {
-                background-color: #1a1a1a;
-                border-top: 1px solid #333333;
-            }
-            
-            textview {
-                background-color: #000000;
-                color: #00ff00;
-                font-family: 'Monospace', 'Courier New', monospace;
-                font-size: 13pt;
-                padding: 15px;
-            }
-            
-            textview text {
-                background-color: #000000;
-                color: #00ff00;
-                caret-color: #00ff00;
-            }
-            
-            entry {
-                background-color: #0a0a0a;
-                color: #00ff00;
-                border: 1px solid #333333;
-                border-radius: 2px;
-                padding: 10px;
-                font-family: 'Monospace', monospace;
-                caret-color: #00ff00;
-            }
-            
-            entry:focus {
-                border-color: #00ff00;
-                box-shadow: 0 0 5px rgba(0, 255, 0, 0.3);
-            }
-            
-            button {
-                background-color: #1a1a1a;
-                color: #00ff00;
-                border: 1px solid #333333;
-                border-radius: 2px;
-                padding: 8px 16px;
-                font-family: monospace;
-            }
-            
-            button:hover {
-                background-color: #2a2a2a;
-                border-color: #00ff00;
-            }
-            
-            button.suggested-action {
-                background-color: #003300;
-                border-color: #00ff00;
-            }
-            
-            button.suggested-action:hover {
-                background-color: #005500;
-            }
-            
-            .dim-label {
-                color: #00ff00;
-            }
-            
-            headerbar {
-                background-color: #0a0a0a;
-                color: #00ff00;
-                border-bottom: 1px solid #333333;
-            }
-            
-            separator {
-                background-color: #333333;
-            }
-            
-            label {
-                color: #00ff00;
-            }
-            
-            .title-2 {
-                color: #00ff00;
-                font-size: 16pt;
-                font-weight: bold;
-            }
-            
-            /* Preferences window styling */
-            preferenceswindow {
-                background-color: #0a0a0a;
-            }
-            
-            preferencespage {
-                background-color: #0a0a0a;
-            }
-            
-            preferencesgroup {
-                background-color: #0a0a0a;
-            }
-            
-            preferencesgroup > box {
-                background-color: #1a1a1a;
-                border: 1px solid #00ff00;
-                border-radius: 0px;
-                padding: 8px;
-            }
-            
-            row {
-                background-color: #1a1a1a;
-                color: #00ff00;
-                border-radius: 0px;
-                padding: 4px;
-            }
-            
-            row:hover {
-                background-color: #2a2a2a;
-            }
-            
-            row entry {
-                background-color: #000000;
-                color: #00ff00;
-                border: 1px solid #00ff00;
-                border-radius: 0px;
-                padding: 8px;
-                font-family: monospace;
-            }
-            
-            row entry:focus {
-                background-color: #0a0a0a;
-                border-color: #00ff00;
-                box-shadow: 0 0 3px rgba(0, 255, 0, 0.5);
-            }
-            
-            combobox {
-                background-color: #1a1a1a;
-                color: #00ff00;
-                border: none;
-                border-radius: 0px;
-            }
-            
-            combobox button {
-                background-color: #1a1a1a;
-                border: none;
-                border-radius: 0px;
-            }
-            
-            .title {
-                color: #00ff00;
-                font-weight: bold;
-            }
-            
-            .subtitle {
-                color: #00aa00;
-            }
-            
-            preferencesgroup > label {
-                color: #00ff00;
-                font-weight: bold;
-            }
-        """)
-        
-        Gtk.StyleContext.add_provider_for_display(
-            self.get_display(),
-            css_provider,
-            Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
-        )
+        # Add CSS for terminal-style dark theme (parsed once per process)
+        if not AITerminalWindow._css_registered:
+            css_provider = Gtk.CssProvider()
+            css_provider.load_from_bytes(_CSS_BYTES)
+            Gtk.StyleContext.add_provider_for_display(
+                self.get_display(),
+                css_provider,
+                Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
+            )
+            AITerminalWindow._css_registered = True
         
         # Main box
         main_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
@@ -321,10 +441,9 @@ class AITerminalWindow(Adw.ApplicationWindow):
         server_label.add_css_class("dim-label")
         status_box.append(server_label)
         
-        self.quick_server_selector = Gtk.ComboBoxText()
-        self.quick_server_selector.append_text("Local")  # Local mode first
-        self.quick_server_selector.set_active(0)
-        self.quick_server_selector.connect("changed", self.on_quick_server_connect)
+        self.quick_server_selector = Gtk.DropDown.new_from_strings(["Local"])  # Local mode first
+        self._quick_handler_id = self.quick_server_selector.connect(
+            "notify::selected", self.on_quick_server_connect)
         status_box.append(self.quick_server_selector)
         
         main_box.append(status_box)
@@ -341,9 +460,19 @@ class AITerminalWindow(Adw.ApplicationWindow):
         self.setup_keyboard_shortcuts()
     
     def on_show_settings(self, button):
-        """Show settings dialog"""
+        """Show settings dialog (built on first use, then reused)"""
+        if self._settings_dialog is None:
+            self._settings_dialog = self._build_settings_dialog()
+        
+        # Refresh fields from the current settings each time it is shown
+        self.load_settings_to_dialog()
+        self._settings_dialog.present()
+    
+    def _build_settings_dialog(self):
+        """Build the settings dialog; closing it only hides it"""
         dialog = Adw.PreferencesWindow(transient_for=self)
         dialog.set_title("Settings")
+        dialog.set_hide_on_close(True)
         
         # SSH Settings Page
         ssh_page = Adw.PreferencesPage()
@@ -359,11 +488,9 @@ class AITerminalWindow(Adw.ApplicationWindow):
         server_selector_row.set_title("Select Server")
         server_selector_row.set_subtitle("Choose from saved SSH servers")
         
-        self.ssh_server_selector = Gtk.ComboBoxText()
+        self.ssh_server_selector = Gtk.DropDown.new_from_strings(["<New Server>"])
         self.ssh_server_selector.set_valign(Gtk.Align.CENTER)
-        self.ssh_server_selector.append_text("<New Server>")
-        self.ssh_server_selector.set_active(0)
-        self.ssh_server_selector.connect("changed", self.on_server_selected)
+        self.ssh_server_selector.connect("notify::selected", self.on_server_selected)
         server_selector_row.add_suffix(self.ssh_server_selector)
         saved_servers_group.add(server_selector_row)
         
@@ -459,6 +586,7 @@ class AITerminalWindow(Adw.ApplicationWindow):
         self.model_selector.set_valign(Gtk.Align.CENTER)
         self.model_selector.append_text("llama2")  # Default
         self.model_selector.set_active(0)
+        self._model_rows = {"llama2": 0}
         model_row.add_suffix(self.model_selector)
         ollama_group.add(model_row)
         
@@ -508,11 +636,8 @@ class AITerminalWindow(Adw.ApplicationWindow):
         
         dialog.add(ai_page)
         
-        # Load current settings into dialog
-        self.load_settings_to_dialog()
-        
         dialog.set_modal(False)  # Make dialog non-modal so chat is visible
-        dialog.present()
+        return dialog
     
     def setup_keyboard_shortcuts(self):
         """Setup keyboard shortcuts for the application"""
@@ -838,21 +963,30 @@ class AITerminalWindow(Adw.ApplicationWindow):
         chat_key_controller.connect("key-pressed", self.on_chat_key_pressed)
         self.chat_view.add_controller(chat_key_controller)
         
-        # Text buffer
+        # Text buffer (read-only, so don't record undo history for every append)
         self.chat_buffer = self.chat_view.get_buffer()
+        self.chat_buffer.set_enable_undo(False)
+        
+        # Create text tags for formatting - terminal-style colors.
+        # Keep the tag objects so appends skip the by-name table lookup.
+        self._chat_tags = {
+            "user": self.chat_buffer.create_tag("user", weight=Pango.Weight.BOLD, foreground="#00ffff"),  # Cyan
+            "ai": self.chat_buffer.create_tag("ai", weight=Pango.Weight.BOLD, foreground="#00ff00"),  # Green
+            "system": self.chat_buffer.create_tag("system", foreground="#ffff00", style=Pango.Style.ITALIC),  # Yellow
+            "command": self.chat_buffer.create_tag("command", family="monospace", foreground="#ff00ff", weight=Pango.Weight.BOLD),  # Magenta
+            "output": self.chat_buffer.create_tag("output", family="monospace", foreground="#aaaaaa"),  # Gray
+            "prompt": self.chat_buffer.create_tag("prompt", foreground="#00ff00"),  # Green
+        }
         
-        # Create text tags for formatting - terminal-style colors
-        self.chat_buffer.create_tag("user", weight=Pango.Weight.BOLD, foreground="#00ffff")  # Cyan
-        self.chat_buffer.create_tag("ai", weight=Pango.Weight.BOLD, foreground="#00ff00")  # Green
-        self.chat_buffer.create_tag("system", foreground="#ffff00", style=Pango.Style.ITALIC)  # Yellow
-        self.chat_buffer.create_tag("command", family="monospace", foreground="#ff00ff", weight=Pango.Weight.BOLD)  # Magenta
-        self.chat_buffer.create_tag("output", family="monospace", foreground="#aaaaaa")  # Gray
-        self.chat_buffer.create_tag("prompt", foreground="#00ff00")  # Green
-        
-        # Create a persistent end mark to avoid creating new marks on every append
+        # Create a persistent end mark to avoid creating new marks on every append.
+        # It has right gravity, so it stays at the end as text is inserted.
         end_iter = self.chat_buffer.get_end_iter()
         self.chat_end_mark = self.chat_buffer.create_mark("chat_end", end_iter, False)
         self._chat_scroll_pending = False
+        self._chat_stream_mark = None  # Insert point of the message being streamed
+        # Left-gravity marks at the start of each message, oldest first, so
+        # trimming can cut on message boundaries
+        self._chat_message_marks = deque()
         
         # Scrolled window for chat
         chat_scroll = Gtk.ScrolledWindow()
@@ -892,6 +1026,12 @@ class AITerminalWindow(Adw.ApplicationWindow):
         self.completions = []
         self.completion_index = 0
         self.last_completion_text = ""
+        # Single-slot worker for completion lookups. A superseded request is
+        # cancelled if it hasn't started yet; otherwise its result is dropped
+        # by comparing against the current sequence number
+        self._completion_exec = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self._completion_seq = 0
+        self._completion_future = None  # Latest lookup submitted
         
         # Send button
         self.send_btn = Gtk.Button(label="Send")
@@ -934,6 +1074,8 @@ class AITerminalWindow(Adw.ApplicationWindow):
             self.completions = []
             self.completion_index = 0
             self.last_completion_text = ""
+            self._completion_seq = 0  # Results for older sequence numbers are dropped
+            self._completion_future = None  # Latest lookup submitted to the parent's worker
             
             # Running command state
             self.command_running = False
@@ -989,15 +1131,19 @@ class AITerminalWindow(Adw.ApplicationWindow):
             self.term_view.add_controller(view_key_controller)
             
             self.term_buffer = self.term_view.get_buffer()
+            self.term_buffer.set_enable_undo(False)  # Read-only output, no undo history
             # Create text tags for formatting - terminal-style colors (same as main)
-            self.term_buffer.create_tag("command", family="monospace", foreground="#ff00ff", weight=Pango.Weight.BOLD)  # Magenta
-            self.term_buffer.create_tag("output", family="monospace", foreground="#aaaaaa")  # Gray
-            self.term_buffer.create_tag("system", foreground="#ffff00", style=Pango.Style.ITALIC)  # Yellow
-            self.term_buffer.create_tag("error", foreground="#ff5555")  # Red
-            self.term_buffer.create_tag("success", foreground="#00ff00")  # Green
-            self.term_buffer.create_tag("cwd", foreground="#00ffff")  # Cyan
+            self._term_tags = {
+                "command": self.term_buffer.create_tag("command", family="monospace", foreground="#ff00ff", weight=Pango.Weight.BOLD),  # Magenta
+                "output": self.term_buffer.create_tag("output", family="monospace", foreground="#aaaaaa"),  # Gray
+                "system": self.term_buffer.create_tag("system", foreground="#ffff00", style=Pango.Style.ITALIC),  # Yellow
+                "error": self.term_buffer.create_tag("error", foreground="#ff5555"),  # Red
+                "success": self.term_buffer.create_tag("success", foreground="#00ff00"),  # Green
+                "cwd": self.term_buffer.create_tag("cwd", foreground="#00ffff"),  # Cyan
+            }
             
-            # Create a persistent end mark to avoid creating new marks on every append
+            # Create a persistent end mark to avoid creating new marks on every append.
+            # It has right gravity, so it stays at the end as text is inserted.
             end_iter = self.term_buffer.get_end_iter()
             self.end_mark = self.term_buffer.create_mark("end", end_iter, False)
             
@@ -1098,10 +1244,11 @@ class AITerminalWindow(Adw.ApplicationWindow):
                 self.term_buffer.set_text("")
                 return True
             else:
-                # Reset completion state on any other key
+                # Reset completion state on any other key and drop in-flight results
                 self.completions = []
                 self.completion_index = 0
                 self.last_completion_text = ""
+                self._cancel_completion()
             
             return False
         
@@ -1114,24 +1261,39 @@ class AITerminalWindow(Adw.ApplicationWindow):
             current_text = self.term_entry.get_text()
             cursor_pos = self.term_entry.get_position()
             text_before_cursor = current_text[:cursor_pos]
-            words = text_before_cursor.split()
-            if not words:
+            partial_word = text_before_cursor.rpartition(' ')[2]
+            if not partial_word and not text_before_cursor:
                 return
             
-            partial_word = words[-1] if words else ""
-            
             if current_text != self.last_completion_text or not self.completions:
-                def get_completions_thread():
-                    completions = client.get_completions(partial_word)
-                    GLib.idle_add(self._apply_completions, completions, current_text, partial_word)
-                
-                thread = threading.Thread(target=get_completions_thread, daemon=True)
-                thread.start()
+                # Share the parent's persistent completion worker
+                self._cancel_completion()
+                seq = self._completion_seq
+                future = self.parent._completion_exec.submit(client.get_completions, partial_word)
+                self._completion_future = future
+                future.add_done_callback(
+                    lambda f: _ui(self._on_completions, seq, f, current_text, partial_word))
             else:
                 if self.completions:
                     self.completion_index = (self.completion_index + 1) % len(self.completions)
                     self._apply_single_completion(self.completions[self.completion_index], current_text, partial_word)
         
+        def _cancel_completion(self):
+            """Supersede the in-flight lookup, cancelling it if it hasn't started"""
+            self._completion_seq += 1
+            if self._completion_future is not None:
+                self._completion_future.cancel()
+                self._completion_future = None
+        
+        def _on_completions(self, seq, future, original_text, partial_word):
+            if seq != self._completion_seq:
+                return False
+            try:
+                completions = future.result()
+            except Exception:
+                completions = []
+            return self._apply_completions(completions, original_text, partial_word)
+        
         def _apply_completions(self, completions, original_text, partial_word):
             self.completions = completions
             self.completion_index = 0
@@ -1155,15 +1317,9 @@ class AITerminalWindow(Adw.ApplicationWindow):
             text_before = original_text[:cursor_pos]
             text_after = original_text[cursor_pos:]
             
-            if partial_word:
-                prefix = text_before[:-len(partial_word)]
-                new_text = prefix + completion + text_after
-            else:
-                new_text = text_before + completion + text_after
-            
-            self.term_entry.set_text(new_text)
-            new_pos = len(prefix) + len(completion) if partial_word else cursor_pos + len(completion)
-            self.term_entry.set_position(new_pos)
+            prefix = text_before[:-len(partial_word)] if partial_word else text_before
+            self.term_entry.set_text(prefix + completion + text_after)
+            self.term_entry.set_position(len(prefix) + len(completion))
 
         def _sync_status(self):
             """Sync status label with parent's connection state"""
@@ -1241,7 +1397,7 @@ class AITerminalWindow(Adw.ApplicationWindow):
 
             def output_callback(text):
                 """Called with each chunk of output"""
-                GLib.idle_add(self._append_output, text, "output")
+                _ui(self._append_output, text, "output")
 
             def run_thread():
                 try:
@@ -1249,21 +1405,21 @@ class AITerminalWindow(Adw.ApplicationWindow):
                     interactive_commands = ['vim', 'nano', 'emacs', 'vi', 'top', 'htop', 'less', 'more', 'man', 'watch', 'tmux', 'screen', 'bash', 'fish', 'zsh', 'sh', 'csh', 'tcsh', 'ksh', 'ssh', 'sftp', 'ftp', 'irssi', 'mc', 'ncdu', 'alsamixer', 'pulsemixer', 'ipython', 'python', 'node', 'ruby', 'irb', 'lua']
                     if cmd.split()[0] in interactive_commands:
                         command_type = "shell" if cmd.split()[0] in ['bash', 'fish', 'zsh', 'sh', 'csh', 'tcsh', 'ksh'] else "interactive command"
-                        GLib.idle_add(self._append_output, f"⚠️  '{cmd.split()[0]}' is an {command_type} that cannot run in this terminal.\n", "error")
+                        _ui(self._append_output, f"⚠️  '{cmd.split()[0]}' is an {command_type} that cannot run in this terminal.\n", "error")
                         if command_type == "shell":
-                            GLib.idle_add(self._append_output, f"💡 You're already in a shell environment. Run commands directly or use the AI terminal for help.\n", "system")
+                            _ui(self._append_output, f"💡 You're already in a shell environment. Run commands directly or use the AI terminal for help.\n", "system")
                         else:
-                            GLib.idle_add(self._append_output, f"💡 Try using 'cat' to view files, or use the AI terminal for suggestions.\n", "system")
-                        GLib.idle_add(self._on_command_complete, False, cmd, cwd, client, f"Interactive command not supported")
+                            _ui(self._append_output, f"💡 Try using 'cat' to view files, or use the AI terminal for suggestions.\n", "system")
+                        _ui(self._on_command_complete, False, cmd, cwd, client, f"Interactive command not supported")
                         return
                     
                     # Execute command and get full output
                     ok, out = client.execute_command(cmd)
                     if out:
-                        GLib.idle_add(self._append_output, out, "output")
-                    GLib.idle_add(self._on_command_complete, ok, cmd, cwd, client)
+                        _ui(self._append_output, _ANSI_RE.sub('', out), "output")
+                    _ui(self._on_command_complete, ok, cmd, cwd, client)
                 except Exception as e:
-                    GLib.idle_add(self._on_command_complete, False, cmd, cwd, client, str(e))
+                    _ui(self._on_command_complete, False, cmd, cwd, client, str(e))
 
             thread = threading.Thread(target=run_thread, daemon=True)
             thread.start()
@@ -1306,18 +1462,17 @@ class AITerminalWindow(Adw.ApplicationWindow):
 
         def _append_output(self, text, tag=None):
             end_iter = self.term_buffer.get_end_iter()
-            if tag:
-                self.term_buffer.insert_with_tags_by_name(end_iter, text, tag)
+            tag_obj = self._term_tags.get(tag) if tag else None
+            if tag_obj is not None:
+                self.term_buffer.insert_with_tags(end_iter, text, tag_obj)
             else:
                 self.term_buffer.insert(end_iter, text)
             
-            # Move the persistent end mark to the new end
-            self.term_buffer.move_mark(self.end_mark, self.term_buffer.get_end_iter())
-            
-            # Throttled scroll - only schedule one scroll at a time
+            # The persistent end mark has right gravity and already follows the insert
+            # Throttled scroll - only schedule one scroll at a time, after queued appends
             if not self._scroll_pending:
                 self._scroll_pending = True
-                GLib.idle_add(self._do_scroll)
+                GLib.idle_add(self._do_scroll, priority=GLib.PRIORITY_LOW)
         
         def _do_scroll(self):
             """Perform the actual scroll (called via idle_add to batch scrolls)"""
@@ -1409,12 +1564,9 @@ class AITerminalWindow(Adw.ApplicationWindow):
         server_label.add_css_class("dim-label")
         status_box.append(server_label)
 
-        quick_combo = Gtk.ComboBoxText()
-        quick_combo.append_text("Local")
-        for server in getattr(self, 'ssh_servers', []):
-            quick_combo.append_text(server.get('name', ''))
-        quick_combo.set_active(0)
-        quick_combo.connect("changed", lambda c: self.on_quick_server_connect(c))
+        quick_combo = Gtk.DropDown.new_from_strings(
+            ["Local"] + [server.get('name', '') for server in getattr(self, 'ssh_servers', [])])
+        quick_combo.connect("notify::selected", self.on_quick_server_connect)
         status_box.append(quick_combo)
 
         main_box.append(status_box)
@@ -1536,37 +1688,139 @@ class AITerminalWindow(Adw.ApplicationWindow):
     def append_chat_message(self, role, message, tag=None):
         """Append a message to the chat display - terminal style"""
         # Check if chat_buffer exists (UI might not be fully initialized yet)
-        if not hasattr(self, 'chat_buffer') or self.chat_buffer is None:
+        if self.chat_buffer is None:
             return
         
         # Add timestamp
-        timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-        end_iter = self.chat_buffer.get_end_iter()
-        self.chat_buffer.insert(end_iter, f"[{timestamp}] ")
+        lt = time.localtime()
+        timestamp = f"{lt.tm_hour:02d}:{lt.tm_min:02d}:{lt.tm_sec:02d}"
+        tag_obj = self._chat_tags.get(tag) if tag else None
         
-        # Insert role with tag if provided
-        if tag:
+        # Hold back property notifications until the whole message is in
+        with self.chat_buffer.freeze_notify():
+            # The iter is revalidated by each insert, so fetch it only once
             end_iter = self.chat_buffer.get_end_iter()
-            self.chat_buffer.insert_with_tags_by_name(end_iter, f"{role}", tag)
-            end_iter = self.chat_buffer.get_end_iter()
-            self.chat_buffer.insert(end_iter, f": {message}\n")
-        else:
-            end_iter = self.chat_buffer.get_end_iter()
-            self.chat_buffer.insert(end_iter, f"{role}: {message}\n")
-        
-        # Add empty line for readability
-        end_iter = self.chat_buffer.get_end_iter()
-        self.chat_buffer.insert(end_iter, "\n")
+            self._chat_message_marks.append(self.chat_buffer.create_mark(None, end_iter, True))
+            if tag_obj is not None:
+                # Only the role is tagged; the rest of the line goes in one insert
+                self.chat_buffer.insert(end_iter, f"[{timestamp}] ")
+                self.chat_buffer.insert_with_tags(end_iter, role, tag_obj)
+                self.chat_buffer.insert(end_iter, f": {message}\n\n")
+            else:
+                self.chat_buffer.insert(end_iter, f"[{timestamp}] {role}: {message}\n\n")
+            
+            self._trim_chat_buffer()
         
-        # Move persistent end mark and use throttled scroll
-        self.chat_buffer.move_mark(self.chat_end_mark, self.chat_buffer.get_end_iter())
+        self._queue_chat_scroll()
+    
+    def _queue_chat_scroll(self):
+        """Schedule one scroll to the end for all appends made this main-loop pass"""
+        # The right-gravity end mark already follows the insert; use throttled scroll.
+        # Low priority lets every already-queued append run before the one scroll.
         if not self._chat_scroll_pending:
             self._chat_scroll_pending = True
-            GLib.idle_add(self._do_chat_scroll)
+            GLib.idle_add(self._do_chat_scroll, priority=GLib.PRIORITY_LOW)
+    
+    def _begin_chat_stream(self, role, tag=None):
+        """Start an empty chat message that _append_chat_stream fills in"""
+        self.append_chat_message(role, "", tag)
+        if self.chat_buffer is None:
+            return False
+        # Stream in front of the blank line that ends the message; right gravity
+        # keeps the mark after each piece so the pieces stay in order
+        stream_iter = self.chat_buffer.get_end_iter()
+        stream_iter.backward_chars(2)
+        self._chat_stream_mark = self.chat_buffer.create_mark(None, stream_iter, False)
+        return False
+    
+    def _append_chat_stream(self, text):
+        """Append text to the message started by _begin_chat_stream"""
+        mark = self._chat_stream_mark
+        if mark is None:
+            return False
+        self.chat_buffer.insert(self.chat_buffer.get_iter_at_mark(mark), text)
+        self._trim_chat_buffer()
+        self._queue_chat_scroll()
+        return False
+    
+    def _end_chat_stream(self):
+        """Finish the streamed message"""
+        if self._chat_stream_mark is not None:
+            self.chat_buffer.delete_mark(self._chat_stream_mark)
+            self._chat_stream_mark = None
+        return False
+    
+    def _chat_streamer(self, role, tag=None, interval=0.05):
+        """Return (feed, finish) for streaming one chat message from a worker thread.
+        feed(token) batches tokens into at most one UI update per interval seconds;
+        finish() flushes the rest and returns True if any text was shown. Leading
+        and trailing whitespace is dropped, matching str.strip()."""
+        pending = []
+        started = False
+        last_flush = 0.0
+        
+        def flush(final=False):
+            nonlocal started
+            text = "".join(pending)
+            if not started:
+                text = text.lstrip()
+            body = text.rstrip()
+            # Hold trailing whitespace back until more text follows it
+            pending[:] = [] if final else [text[len(body):]]
+            if body:
+                if not started:
+                    started = True
+                    _ui(self._begin_chat_stream, role, tag)
+                _ui(self._append_chat_stream, body)
+        
+        def feed(token):
+            nonlocal last_flush
+            pending.append(token)
+            now = time.monotonic()
+            if now - last_flush >= interval:
+                last_flush = now
+                flush()
+        
+        def finish():
+            flush(final=True)
+            if started:
+                _ui(self._end_chat_stream)
+            return started
+        
+        return feed, finish
+    
+    def _flush_chat_batch(self, batch):
+        """Append several (role, message, tag) rows as one buffer user action.
+        Scheduled via _ui so related rows land in a single main-loop pass.
+        """
+        self.chat_buffer.begin_user_action()
+        try:
+            for role, message, tag in batch:
+                self.append_chat_message(role, message, tag)
+        finally:
+            self.chat_buffer.end_user_action()
+        return False
+    
+    def _trim_chat_buffer(self):
+        """Drop the oldest messages once the chat exceeds MAX_CHAT_BUFFER_CHARS"""
+        excess = self.chat_buffer.get_char_count() - MAX_CHAT_BUFFER_CHARS
+        if excess <= 0:
+            return
+        
+        # Snap the cut forward to the start of a message so whole messages are
+        # dropped. The newest start is kept even when it lies before the cut:
+        # a single message longer than the limit is cut at the exact offset
+        marks = self._chat_message_marks
+        while len(marks) > 1 and self.chat_buffer.get_iter_at_mark(marks[0]).get_offset() < excess:
+            self.chat_buffer.delete_mark(marks.popleft())
+        cut_iter = self.chat_buffer.get_iter_at_mark(marks[0]) if marks else None
+        if cut_iter is None or cut_iter.get_offset() < excess:
+            cut_iter = self.chat_buffer.get_iter_at_offset(excess)
+        self.chat_buffer.delete(self.chat_buffer.get_start_iter(), cut_iter)
     
     def scroll_to_top(self):
         """Scroll the chat view to the top"""
-        if hasattr(self, 'chat_view') and self.chat_view is not None:
+        if self.chat_view is not None:
             start_iter = self.chat_buffer.get_start_iter()
             self.chat_view.scroll_to_iter(start_iter, 0.0, True, 0.0, 0.0)
         return False  # Remove from idle queue
@@ -1582,7 +1836,7 @@ class AITerminalWindow(Adw.ApplicationWindow):
     
     def scroll_to_bottom(self):
         """Scroll the chat view to the bottom"""
-        if hasattr(self, 'chat_view') and self.chat_view is not None:
+        if self.chat_view is not None:
             self.chat_view.scroll_mark_onscreen(self.chat_end_mark)
         return False  # Remove from idle queue
     
@@ -1640,10 +1894,11 @@ class AITerminalWindow(Adw.ApplicationWindow):
             self.input_entry.set_position(-1)
             return True
         else:
-            # Reset completion state on any other key
+            # Reset completion state on any other key and drop in-flight results
             self.completions = []
             self.completion_index = 0
             self.last_completion_text = ""
+            self._cancel_completion()
         
         return False
     
@@ -1658,28 +1913,43 @@ class AITerminalWindow(Adw.ApplicationWindow):
         # Get the word to complete (text before cursor)
         text_before_cursor = current_text[:cursor_pos]
         
-        # Find the start of the current word
-        words = text_before_cursor.split()
-        if not words:
+        # The current word is whatever follows the last space
+        partial_word = text_before_cursor.rpartition(' ')[2]
+        if not partial_word and not text_before_cursor:
             return
         
-        partial_word = words[-1] if words else ""
-        
         # If this is a new completion request or different text
         if current_text != self.last_completion_text or not self.completions:
-            # Get completions from SSH
-            def get_completions_thread():
-                completions = self.ssh_client.get_completions(partial_word)
-                GLib.idle_add(self.apply_completions, completions, current_text, partial_word)
-            
-            thread = threading.Thread(target=get_completions_thread, daemon=True)
-            thread.start()
+            # Get completions from SSH; a newer Tab press supersedes this one
+            self._cancel_completion()
+            seq = self._completion_seq
+            future = self._completion_exec.submit(self.ssh_client.get_completions, partial_word)
+            self._completion_future = future
+            future.add_done_callback(
+                lambda f: _ui(self._on_completions, seq, f, current_text, partial_word))
         else:
             # Cycle through existing completions
             if self.completions:
                 self.completion_index = (self.completion_index + 1) % len(self.completions)
                 self.apply_completion(self.completions[self.completion_index], current_text, partial_word)
     
+    def _cancel_completion(self):
+        """Supersede the in-flight lookup, cancelling it if it hasn't started"""
+        self._completion_seq += 1
+        if self._completion_future is not None:
+            self._completion_future.cancel()
+            self._completion_future = None
+    
+    def _on_completions(self, seq, future, original_text, partial_word):
+        """Deliver completion results unless a newer request superseded them"""
+        if seq != self._completion_seq:
+            return False
+        try:
+            completions = future.result()
+        except Exception:
+            completions = []
+        return self.apply_completions(completions, original_text, partial_word)
+    
     def apply_completions(self, completions, original_text, partial_word):
         """Apply completions received from SSH"""
         self.completions = completions
@@ -1707,22 +1977,15 @@ class AITerminalWindow(Adw.ApplicationWindow):
         text_before = original_text[:cursor_pos]
         text_after = original_text[cursor_pos:]
         
-        # Replace the partial word with the completion
-        if partial_word:
-            # Remove partial word from end
-            prefix = text_before[:-len(partial_word)]
-            new_text = prefix + completion + text_after
-        else:
-            new_text = text_before + completion + text_after
-        
-        self.input_entry.set_text(new_text)
+        # Replace the partial word (if any) at the end of text_before with the completion
+        prefix = text_before[:-len(partial_word)] if partial_word else text_before
+        self.input_entry.set_text(prefix + completion + text_after)
         # Set cursor position after the completion
-        new_pos = len(prefix) + len(completion) if partial_word else cursor_pos + len(completion)
-        self.input_entry.set_position(new_pos)
+        self.input_entry.set_position(len(prefix) + len(completion))
     
-    def on_server_selected(self, combo):
+    def on_server_selected(self, dropdown, pspec=None):
         """Handle server selection from dropdown"""
-        server_name = combo.get_active_text()
+        server_name = self._get_selected_string(dropdown)
         if not server_name or server_name == "<New Server>":
             # Clear fields for new server
             self.ssh_server_name_entry.set_text("My Server")
@@ -1733,14 +1996,13 @@ class AITerminalWindow(Adw.ApplicationWindow):
             return
         
         # Load server configuration
-        for server in self.ssh_servers:
-            if server.get('name') == server_name:
-                self.ssh_server_name_entry.set_text(server.get('name', ''))
-                self.ssh_host_entry.set_text(server.get('host', ''))
-                self.ssh_port_entry.set_text(str(server.get('port', 22)))
-                self.ssh_username_entry.set_text(server.get('username', ''))
-                self.ssh_password_entry.set_text(server.get('password', ''))
-                break
+        server = self._servers_by_name.get(server_name)
+        if server:
+            self.ssh_server_name_entry.set_text(server.get('name', ''))
+            self.ssh_host_entry.set_text(server.get('host', ''))
+            self.ssh_port_entry.set_text(str(server.get('port', 22)))
+            self.ssh_username_entry.set_text(server.get('username', ''))
+            self.ssh_password_entry.set_text(server.get('password', ''))
     
     def on_save_server(self, button):
         """Save current server configuration"""
@@ -1761,91 +2023,93 @@ class AITerminalWindow(Adw.ApplicationWindow):
         }
         
         # Check if server already exists
-        existing_index = -1
-        for i, server in enumerate(self.ssh_servers):
-            if server.get('name') == server_name:
-                existing_index = i
-                break
-        
-        if existing_index >= 0:
-            # Update existing server
-            self.ssh_servers[existing_index] = server_config
+        existing = self._servers_by_name.get(server_name)
+        
+        if existing is not None:
+            # Update existing server in place (shared by the list and the index)
+            existing.clear()
+            existing.update(server_config)
         else:
             # Add new server
             self.ssh_servers.append(server_config)
+            self._servers_by_name[server_name] = server_config
         
         # Save to settings
         self.save_settings()
         
-        # Update dropdown
-        self.refresh_server_dropdown()
-        
-        # Select the saved server
-        for i in range(self.ssh_server_selector.get_model().__len__()):
-            self.ssh_server_selector.set_active(i)
-            if self.ssh_server_selector.get_active_text() == server_name:
-                break
+        # Update dropdown and select the saved server. The form already holds
+        # its values, so neither the new model nor the selection change may
+        # reload (or reset) them
+        self.ssh_server_selector.handler_block_by_func(self.on_server_selected)
+        try:
+            self.refresh_server_dropdown()
+            self.ssh_server_selector.set_selected(self._server_rows.get(server_name, 0))
+        finally:
+            self.ssh_server_selector.handler_unblock_by_func(self.on_server_selected)
         
         self.append_chat_message("SYSTEM", f"Server '{server_name}' saved successfully", "system")
     
     def on_delete_server(self, button):
         """Delete selected server configuration"""
-        server_name = self.ssh_server_selector.get_active_text()
+        server_name = self._get_selected_string(self.ssh_server_selector)
         
         if not server_name or server_name == "<New Server>":
             self.show_error_dialog("Please select a server to delete")
             return
         
-        # Remove from list
-        self.ssh_servers = [s for s in self.ssh_servers if s.get('name') != server_name]
+        # Remove from list and index
+        server = self._servers_by_name.pop(server_name, None)
+        if server is not None:
+            self.ssh_servers.remove(server)
         
         # Save settings
         self.save_settings()
         
         # Refresh dropdown and select new server
         self.refresh_server_dropdown()
-        self.ssh_server_selector.set_active(0)
+        self.ssh_server_selector.set_selected(0)
         
         self.append_chat_message("SYSTEM", f"Server '{server_name}' deleted", "system")
     
     def refresh_server_dropdown(self):
         """Refresh the server dropdown list"""
-        # Update settings dialog dropdown
+        server_names = [server.get('name', '') for server in self.ssh_servers]
+        # Both selectors list one fixed option first, so a server's row is the
+        # same in each of them
+        self._server_rows = {name: i for i, name in enumerate(server_names, 1)}
+        
+        # Update settings dialog dropdown ("<New Server>" option first)
         if self.ssh_server_selector:
-            # Clear current items
-            self.ssh_server_selector.remove_all()
-            
-            # Add new server option
-            self.ssh_server_selector.append_text("<New Server>")
-            
-            # Add all saved servers
-            for server in self.ssh_servers:
-                self.ssh_server_selector.append_text(server.get('name', ''))
+            self.ssh_server_selector.set_model(Gtk.StringList.new(["<New Server>"] + server_names))
         
         # Update quick selector on main screen
         if hasattr(self, 'quick_server_selector'):
-            current_selection = self.quick_server_selector.get_active_text()
-            
-            # Clear and repopulate
-            self.quick_server_selector.remove_all()
-            self.quick_server_selector.append_text("Local")  # Always have Local option first
-            
-            for server in self.ssh_servers:
-                self.quick_server_selector.append_text(server.get('name', ''))
-            
-            # Try to restore previous selection
-            if current_selection:
-                for i in range(self.quick_server_selector.get_model().__len__()):
-                    self.quick_server_selector.set_active(i)
-                    if self.quick_server_selector.get_active_text() == current_selection:
-                        return
+            current_selection = self._get_selected_string(self.quick_server_selector)
             
-            # Default to Local (first item)
-            self.quick_server_selector.set_active(0)
+            # Repopulate without triggering connects for the intermediate states
+            self.quick_server_selector.handler_block(self._quick_handler_id)
+            try:
+                # Always with the Local option first
+                quick_items = ["Local"] + server_names
+                self.quick_server_selector.set_model(Gtk.StringList.new(quick_items))
+                
+                # Restore previous selection, defaulting to Local (first item)
+                self.quick_server_selector.set_selected(self._server_rows.get(current_selection, 0))
+            finally:
+                self.quick_server_selector.handler_unblock(self._quick_handler_id)
+            
+            # Notify once if the selection really changed (e.g. its server was deleted)
+            if current_selection and self._get_selected_string(self.quick_server_selector) != current_selection:
+                self.on_quick_server_connect(self.quick_server_selector)
     
-    def on_quick_server_connect(self, combo):
+    def _get_selected_string(self, dropdown):
+        """Return the text of a StringList-backed dropdown's selected item, or None"""
+        item = dropdown.get_selected_item()
+        return item.get_string() if item is not None else None
+    
+    def on_quick_server_connect(self, dropdown, pspec=None):
         """Handle quick server selection and connection from main screen"""
-        server_name = combo.get_active_text()
+        server_name = self._get_selected_string(dropdown)
         
         if not server_name:
             return
@@ -1864,40 +2128,41 @@ class AITerminalWindow(Adw.ApplicationWindow):
             return
         
         # Find the server configuration for remote connections
-        for server in self.ssh_servers:
-            if server.get('name') == server_name:
-                host = server.get('host', '')
-                username = server.get('username', '')
-                password = server.get('password', '')
-                port = server.get('port', 22)
-                
-                if not host or not username:
-                    self.append_chat_message("ERROR", f"Server '{server_name}' has incomplete configuration", "system")
-                    combo.set_active(0)  # Reset to Local
-                    return
-                
-                # Switch to SSH mode
-                self.local_mode = False
-                
-                # Connect to SSH
-                self.ssh_status_label.set_label(f"Connecting to {server_name}...")
-                self.append_chat_message("SYSTEM", f"Connecting to {server_name}...", "system")
-                
-                def connect_thread():
-                    self.ssh_client = SSHClient(host, username, password, port=port)
-                    success, message = self.ssh_client.connect()
-                    GLib.idle_add(self.on_quick_connect_complete, success, message, server_name)
-                
-                thread = threading.Thread(target=connect_thread, daemon=True)
-                thread.start()
-                
-                # Save as last server
-                self.saved_settings['last_server'] = server_name
-                self.settings_manager.save_settings(self.saved_settings)
-                return
+        server = self._servers_by_name.get(server_name)
+        if server is None:
+            # Server not found, reset to Local
+            dropdown.set_selected(0)
+            return
+        
+        host = server.get('host', '')
+        username = server.get('username', '')
+        password = server.get('password', '')
+        port = server.get('port', 22)
+        
+        if not host or not username:
+            self.append_chat_message("ERROR", f"Server '{server_name}' has incomplete configuration", "system")
+            dropdown.set_selected(0)  # Reset to Local
+            return
+        
+        # Switch to SSH mode
+        self.local_mode = False
+        
+        # Connect to SSH
+        self.ssh_status_label.set_label(f"Connecting to {server_name}...")
+        self.append_chat_message("SYSTEM", f"Connecting to {server_name}...", "system")
         
-        # Server not found, reset to Local
-        combo.set_active(0)
+        def connect_thread():
+            from ssh_client import SSHClient
+            self.ssh_client = SSHClient(host, username, password, port=port)
+            success, message = self.ssh_client.connect()
+            _ui(self.on_quick_connect_complete, success, message, server_name)
+        
+        thread = threading.Thread(target=connect_thread, daemon=True)
+        thread.start()
+        
+        # Save as last server
+        self.saved_settings['last_server'] = server_name
+        self._schedule_settings_flush()
     
     def on_quick_connect_complete(self, success, message, server_name):
         """Handle quick connect completion"""
@@ -1908,7 +2173,7 @@ class AITerminalWindow(Adw.ApplicationWindow):
             self.ssh_status_label.set_label("SSH: ✗ Failed")
             self.append_chat_message("ERROR", f"Connection to {server_name} failed: {message}", "system")
             # Reset dropdown
-            self.quick_server_selector.set_active(0)
+            self.quick_server_selector.set_selected(0)
         return False
     
     def on_ssh_connect(self, button):
@@ -1927,10 +2192,11 @@ class AITerminalWindow(Adw.ApplicationWindow):
         self.ssh_status_label.set_label("Connecting...")
         
         def connect_thread():
+            from ssh_client import SSHClient
             self.ssh_client = SSHClient(host, username, password, port=port)
             success, message = self.ssh_client.connect()
             
-            GLib.idle_add(self.on_ssh_connect_complete, success, message)
+            _ui(self.on_ssh_connect_complete, success, message)
         
         thread = threading.Thread(target=connect_thread, daemon=True)
         thread.start()
@@ -1965,13 +2231,23 @@ class AITerminalWindow(Adw.ApplicationWindow):
         self.ollama_status_label.set_label("Testing...")
         
         def test_thread():
-            client = OllamaClient(host=ollama_url)
+            client = self._get_ollama_client(ollama_url)
             success, message = client.test_connection()
             
-            GLib.idle_add(self.on_ollama_test_complete, success, message)
+            _ui(self.on_ollama_test_complete, success, message)
         
-        thread = threading.Thread(target=test_thread, daemon=True)
-        thread.start()
+        self._executor.submit(test_thread)
+    
+    def _get_ollama_client(self, url, model=None):
+        """Return the shared OllamaClient, rebuilding it only when the URL changes"""
+        client = self.ollama_client
+        if client is None or client.host != url.rstrip('/'):
+            from ollama_client import OllamaClient
+            client = OllamaClient(host=url, model=model) if model else OllamaClient(host=url)
+            self.ollama_client = client
+        elif model:
+            client.model = model
+        return client
     
     def on_ollama_test_complete(self, success, message):
         """Handle Ollama test completion"""
@@ -1995,13 +2271,12 @@ class AITerminalWindow(Adw.ApplicationWindow):
         button.set_label("Loading...")
         
         def load_thread():
-            client = OllamaClient(host=ollama_url)
+            client = self._get_ollama_client(ollama_url)
             success, models = client.list_models()
             
-            GLib.idle_add(self.on_models_loaded, success, models, button)
+            _ui(self.on_models_loaded, success, models, button)
         
-        thread = threading.Thread(target=load_thread, daemon=True)
-        thread.start()
+        self._executor.submit(load_thread)
     
     def on_models_loaded(self, success, models, button):
         """Handle models loaded from Ollama"""
@@ -2009,22 +2284,22 @@ class AITerminalWindow(Adw.ApplicationWindow):
         button.set_label("Load Models")
         
         if success and models:
-            # Clear existing models
-            self.model_selector.remove_all()
-            
             # Get current selected model
             current_model = self.saved_settings.get('ollama_model', 'llama2')
-            active_index = 0
             
-            # Add all models
+            # Build the full list off-widget (same (text, id) columns as the
+            # ComboBoxText default model) and install it in one call
+            store = Gtk.ListStore(str, str)
+            model_rows = {}
             for i, model in enumerate(models):
                 model_name = model.get('name', model) if isinstance(model, dict) else model
-                self.model_selector.append_text(model_name)
-                if model_name == current_model:
-                    active_index = i
+                store.append([model_name, model_name])
+                model_rows.setdefault(model_name, i)
+            self.model_selector.set_model(store)
+            self._model_rows = model_rows
             
             # Set active model
-            self.model_selector.set_active(active_index)
+            self.model_selector.set_active(model_rows.get(current_model, 0))
             
             self.append_chat_message("SYSTEM", f"Loaded {len(models)} models from Ollama", "system")
         else:
@@ -2057,7 +2332,7 @@ class AITerminalWindow(Adw.ApplicationWindow):
         self.append_chat_message("USER", message, "user")
         
         # Add to conversation history
-        self.conversation_history.append({"role": "user", "content": message})
+        self._add_to_conversation("user", message)
         
         # Disable send button during processing
         self.send_btn.set_sensitive(False)
@@ -2074,50 +2349,51 @@ class AITerminalWindow(Adw.ApplicationWindow):
         """Process AI command and execute if needed"""
         try:
             # Get settings (use saved values or defaults)
-            ollama_url = self.saved_settings.get('ollama_url', 'http://localhost:11434')
-            model = self.saved_settings.get('ollama_model', 'llama2')
-            ai_name = self.saved_settings.get('ai_name', 'Jarvis')
-            ai_role = self.saved_settings.get('ai_role', 'Linux Expert')
-            
-            # Build context from history
-            context = ""
-            if self.conversation_history:
-                context = "\n\nPrevious conversation context:\n"
-                for msg in self.conversation_history[-5:]:
-                    role = msg.get('role', 'user')
-                    content = msg.get('content', '')
-                    context += f"{role}: {content}\n"
+            settings = self.saved_settings
+            ollama_url = settings.get('ollama_url', 'http://localhost:11434')
+            model = settings.get('ollama_model', 'llama2')
+            ai_name = settings.get('ai_name', 'Jarvis')
+            ai_role = settings.get('ai_role', 'Linux Expert')
+            
+            # Truncate very long output based on user setting (fallback to default)
+            max_output = settings.get('max_output_chars', MAX_OUTPUT_CHARS)
+            try:
+                max_output = int(max_output)
+                if max_output < 0:
+                    max_output = MAX_OUTPUT_CHARS
+            except Exception:
+                max_output = MAX_OUTPUT_CHARS
+            
+            # Local aliases for the calls made on every path below
+            ui = _ui
+            append = self.append_chat_message
+            
+            # Build context from history, reusing the last one if nothing was added since
+            version, context = self._last_context
+            if version != self._history_version:
+                version = self._history_version
+                context = ""
+                history = self.conversation_history
+                if history:
+                    recent = itertools.islice(history, max(len(history) - 5, 0), None)
+                    context = "\n\nPrevious conversation context:\n" + "".join(line for _, line in recent)
+                self._last_context = (version, context)
             
             # Create prompt for AI
-            prompt = f"""You are {ai_name}, a {ai_role}. YOU HAVE FULL SSH ACCESS TO THE SERVER and can run any command.
-{context}
-
-A user has now requested: "{request_text}"
-
-IMPORTANT INSTRUCTIONS:
-- You MUST respond in EXACTLY this format, with each line starting with the exact keywords below.
-- Do NOT use JSON, do NOT use code blocks, do NOT include any extra structured fields, and do NOT deviate from this format.
-- Each response must have these 2 lines:
-
-COMMAND: [If the user asks you to run something, write the single shell command to run. If no command is needed, write NONE]
-RESPONSE: [Your human-readable analysis or conversational reply]
-
-RESPONSE GUIDELINES (what to include in RESPONSE):
-- Give a concise (1-3 sentence) explanation of what the COMMAND will do, or provide a helpful conversational response.
-- If COMMAND is not NONE, briefly describe the *expected* output and how to interpret it (1-2 sentences).
-- Important: After the command is executed by the system, you will be asked to comment on the *actual* command output. Prepare your RESPONSE so it can be extended later: summarize what to look for in the output and what would indicate success vs. failure.
-- If the command could be destructive or risky (e.g., use of rm, dd, shutdown, usermod, etc.), include a one-line safety warning in the RESPONSE.
-- If there is no expected output or the command typically produces no output, include a short one-line humorous remark you would add later (e.g., "No news is good news — looks like it succeeded quietly.").
-- If no command is needed, engage in helpful conversation, provide information, or include jokes when appropriate.
-- Keep the RESPONSE polite, concise, and useful. Use plain text only."""
+            prompt = _PROMPT.substitute(
+                ai_name=ai_name, ai_role=ai_role, context=context, request_text=request_text)
             
             # Get AI response
-            client = OllamaClient(host=ollama_url, model=model)
-            success, ai_response = client.generate(prompt)
-            
-            if not success:
-                GLib.idle_add(self.on_ai_error, ai_response)
-                return
+            client = self._get_ollama_client(ollama_url, model)
+            cache_key = self.ai_cache.make_key(model, prompt)
+            ai_response = self.ai_cache.get(cache_key)
+            if ai_response is None:
+                success, ai_response = client.generate(prompt)
+                
+                if not success:
+                    ui(self.on_ai_error, ai_response)
+                    return
+                self.ai_cache.set(cache_key, ai_response)
             
             # Parse AI response
             command, response = self.parse_ai_response(ai_response)
@@ -2127,75 +2403,70 @@ RESPONSE GUIDELINES (what to include in RESPONSE):
                 # Show current directory with command
                 current_dir = getattr(self.ssh_client, 'current_directory', None)
                 if current_dir:
-                    GLib.idle_add(self.append_chat_message, "COMMAND", f"[{current_dir}]$ {command}", "command")
+                    ui(append, "COMMAND", f"[{current_dir}]$ {command}", "command")
                 else:
-                    GLib.idle_add(self.append_chat_message, "COMMAND", f"$ {command}", "command")
+                    ui(append, "COMMAND", f"$ {command}", "command")
                 
-                # Record executed command in history (use idle_add to modify UI-thread state)
-                GLib.idle_add(self._add_command_to_history, command)
+                # Record executed command in history (on the UI thread, which owns it)
+                ui(self._add_command_to_history, command)
                 
-                success, output = self.ssh_client.execute_command(command)
+                # Have the client keep no more than the limit; a UTF-8 character is
+                # at most 4 bytes, so this always yields more than max_output chars
+                # when the output is too long
+                success, output = self.ssh_client.execute_command(command, max_bytes=4 * max_output + 4)
                 
                 if success:
-                    # Truncate very long output based on user setting (fallback to default)
-                    max_output = self.saved_settings.get('max_output_chars', MAX_OUTPUT_CHARS)
-                    try:
-                        max_output = int(max_output)
-                        if max_output < 0:
-                            max_output = MAX_OUTPUT_CHARS
-                    except Exception:
-                        max_output = MAX_OUTPUT_CHARS
+                    output = _ANSI_RE.sub('', output)
                     if len(output) > max_output:
-                        output = output[:max_output] + f"\n... (output truncated, {len(output)} chars total)\n\nNote: output was truncated by the 'Max Output Characters' setting. You can increase this limit in Settings (Settings → AI Personality → Max Output Characters) to see more output."
-                    GLib.idle_add(self.append_chat_message, "OUTPUT", output or "(no output)", "output")
+                        # Build the truncated text in one step rather than slice + concatenate
+                        output = f"{output[:max_output]}\n... (output truncated after {max_output} chars){_TRUNCATION_NOTE}"
+                    batch = [("OUTPUT", output or "(no output)", "output")]
                     
                     # Show updated directory if it changed
                     new_dir = getattr(self.ssh_client, 'current_directory', None)
                     if new_dir and new_dir != current_dir:
-                        GLib.idle_add(self.append_chat_message, "SYSTEM", f"Directory changed to: {new_dir}", "system")
+                        batch.append(("SYSTEM", f"Directory changed to: {new_dir}", "system"))
+                    ui(self._flush_chat_batch, batch)
                     
-                    # Ask the AI to comment on the actual output (summarize, highlight errors, or make a light joke if empty)
+                    # Ask the AI to comment on the actual output (summarize, highlight errors, or make a light joke if empty).
+                    # The comment is plain text, so it is shown token by token as it streams in
+                    feed, finish = self._chat_streamer(ai_name.upper(), "ai")
                     try:
-                        post_prompt = f"""You are {ai_name}, a {ai_role}. The command below was executed:
-{command}
-
-The output produced was:
-{output}
-
-In a concise (1-4 sentence) plain-text comment, do the following:
-- Summarize the most important information in the output.
-- If the output is empty or only whitespace, reply with a short light-hearted one-line joke and a confirmation that the command likely succeeded (or suggest a verification step).
-- If the output contains errors, point out the principal error lines and suggest a safe next step.
-- Do NOT include additional shell commands or structured data. Keep it helpful and to the point.
-"""
-                        post_success, post_response = client.generate(post_prompt)
+                        post_prompt = _ANALYSIS_PROMPT.substitute(
+                            ai_name=ai_name, ai_role=ai_role, command=command, output=output)
+                        post_success, post_response = client.generate_stream(post_prompt, feed)
                         if post_success:
                             analysis = post_response.strip()
                         else:
                             analysis = response if response else f"No analysis available: {post_response}"
                     except Exception as e:
+                        post_success = False
                         analysis = response if response else f"No analysis available: {e}"
+                    streamed = finish()
                     
-                    # Append analysis to chat and history
-                    GLib.idle_add(self.append_chat_message, ai_name.upper(), analysis, "ai")
-                    self.conversation_history.append({
-                        "role": "assistant", 
-                        "content": f"Executed: {command}\nOutput: {output}\nAnalysis: {analysis}"
-                    })
+                    # Append analysis to chat (unless it already streamed in) and history
+                    if not (post_success and streamed):
+                        ui(append, ai_name.upper(), analysis, "ai")
+                    self._add_to_conversation(
+                        "assistant",
+                        f"Executed: {command}\nOutput: {output}\nAnalysis: {analysis}"
+                    )
                 else:
-                    GLib.idle_add(self.append_chat_message, "ERROR", output, "system")
+                    ui(append, "ERROR", output, "system")
             else:
                 # No command to execute - this is a conversation
-                GLib.idle_add(self.append_chat_message, ai_name.upper(), response, "ai")
-                self.conversation_history.append({
-                    "role": "assistant", 
-                    "content": response
-                })
+                ui(append, ai_name.upper(), response, "ai")
+                self._add_to_conversation("assistant", response)
             
         except Exception as e:
-            GLib.idle_add(self.on_ai_error, str(e))
+            _ui(self.on_ai_error, str(e))
         finally:
-            GLib.idle_add(self.re_enable_input)
+            _ui(self.re_enable_input)
+    
+    def _add_to_conversation(self, role, content):
+        """Record a message, pre-rendered in the form used for prompt context"""
+        self.conversation_history.append((role, f"{role}: {content}\n"))
+        self._history_version += 1
     
     def re_enable_input(self):
         """Re-enable input after processing"""
@@ -2206,7 +2477,7 @@ In a concise (1-4 sentence) plain-text comment, do the following:
 
     def _add_command_to_history(self, command):
         """Add a command to the in-memory history (avoid consecutive duplicates).
-        Used via GLib.idle_add so return False to remove from idle loop after running.
+        Scheduled via _ui from worker threads; returns False so it runs once.
         """
         try:
             if not command:
@@ -2265,23 +2536,7 @@ In a concise (1-4 sentence) plain-text comment, do the following:
         return False    
     def parse_ai_response(self, response):
         """Parse AI response to extract command and response"""
-        lines = response.strip().split('\n')
-        command = "NONE"
-        ai_message = ""
-        response_started = False
-        
-        for line in lines:
-            if line.startswith("COMMAND:"):
-                command = line.replace("COMMAND:", "").strip()
-                response_started = False
-            elif line.startswith("RESPONSE:"):
-                ai_message = line.replace("RESPONSE:", "").strip()
-                response_started = True
-            elif response_started:
-                # Continue capturing lines that are part of the response
-                ai_message += "\n" + line
-        
-        return command, ai_message
+        return parse_ai_response(response)
     
     def on_ai_error(self, error_msg):
         """Handle AI error"""
@@ -2291,8 +2546,12 @@ In a concise (1-4 sentence) plain-text comment, do the following:
     
     def on_clear_chat(self, button):
         """Clear chat history"""
+        self._end_chat_stream()
+        while self._chat_message_marks:
+            self.chat_buffer.delete_mark(self._chat_message_marks.popleft())
         self.chat_buffer.set_text("")
         self.conversation_history.clear()
+        self._history_version += 1
         self.append_chat_message("SYSTEM", "Chat cleared", "system")
     
     def show_error_dialog(self, message):
@@ -2311,10 +2570,15 @@ In a concise (1-4 sentence) plain-text comment, do the following:
         
         # Load SSH servers list
         self.ssh_servers = self.saved_settings.get('ssh_servers', [])
+        self._rebuild_server_index()
         
         # Populate quick server selector on main screen
         self.refresh_server_dropdown()
     
+    def _rebuild_server_index(self):
+        """Rebuild the name -> server lookup from self.ssh_servers"""
+        self._servers_by_name = {s.get('name'): s for s in self.ssh_servers}
+    
     def load_settings_to_dialog(self):
         """Load settings into the settings dialog entries"""
         if self.saved_settings:
@@ -2323,15 +2587,12 @@ In a concise (1-4 sentence) plain-text comment, do the following:
             
             # Load last used server or first server
             last_server = self.saved_settings.get('last_server', '')
-            if last_server and self.ssh_servers:
-                # Try to select last used server
-                for i in range(self.ssh_server_selector.get_model().__len__()):
-                    self.ssh_server_selector.set_active(i)
-                    if self.ssh_server_selector.get_active_text() == last_server:
-                        break
+            if last_server in self._server_rows:
+                # Select last used server
+                self.ssh_server_selector.set_selected(self._server_rows[last_server])
             elif self.ssh_servers:
                 # Select first server
-                self.ssh_server_selector.set_active(1)  # 0 is <New Server>
+                self.ssh_server_selector.set_selected(1)  # 0 is <New Server>
             
             # Load Ollama and AI settings
             self.ollama_host_entry.set_text(self.saved_settings.get('ollama_url', 'http://localhost:11434'))
@@ -2342,14 +2603,9 @@ In a concise (1-4 sentence) plain-text comment, do the following:
             
             # Load saved model selection
             saved_model = self.saved_settings.get('ollama_model', 'llama2')
-            # Try to set the saved model as active
-            model = self.model_selector.get_model()
-            for i in range(len(model)):
-                if self.model_selector.get_active_text() == saved_model:
-                    break
-                self.model_selector.set_active(i)
-                if self.model_selector.get_active_text() == saved_model:
-                    break
+            row = self._model_rows.get(saved_model)
+            if row is not None:
+                self.model_selector.set_active(row)
     
     def save_settings(self):
         """Save current settings"""
@@ -2359,7 +2615,7 @@ In a concise (1-4 sentence) plain-text comment, do the following:
                 selected_model = "llama2"
             
             # Get currently selected server name
-            current_server = self.ssh_server_selector.get_active_text()
+            current_server = self._get_selected_string(self.ssh_server_selector)
             if current_server and current_server != "<New Server>":
                 last_server = current_server
             else:
@@ -2384,9 +2640,28 @@ In a concise (1-4 sentence) plain-text comment, do the following:
             }
             
             self.saved_settings = settings
-            self.settings_manager.save_settings(settings)
+            self._schedule_settings_flush()
             self.append_chat_message("SYSTEM", f"Settings saved. Using model: {selected_model}", "system")
     
+    def _schedule_settings_flush(self):
+        """Snapshot settings and write them off the UI thread, coalescing
+        changes made within 500ms into one write"""
+        with self._settings_lock:
+            self._pending_settings = copy.deepcopy(self.saved_settings)
+            if self._settings_timer is not None:
+                self._settings_timer.cancel()
+            self._settings_timer = threading.Timer(0.5, self._flush_settings_if_dirty)
+            self._settings_timer.daemon = True
+            self._settings_timer.start()
+    
+    def _flush_settings_if_dirty(self):
+        """Write the pending settings snapshot to disk, if any"""
+        with self._settings_write_lock:
+            with self._settings_lock:
+                settings, self._pending_settings = self._pending_settings, None
+            if settings is not None:
+                self.settings_manager.save_settings(settings)
+    
     def auto_connect_from_settings(self):
         """Auto-connect to SSH and Ollama if settings are saved"""
         if not self.saved_settings:
@@ -2394,28 +2669,25 @@ In a concise (1-4 sentence) plain-text comment, do the following:
         
         # Auto-connect SSH to last used server
         last_server = self.saved_settings.get('last_server', '')
-        ssh_servers = self.saved_settings.get('ssh_servers', [])
-        
-        if last_server and ssh_servers:
-            # Find the last used server
-            for server in ssh_servers:
-                if server.get('name') == last_server:
-                    ssh_host = server.get('host', '')
-                    ssh_username = server.get('username', '')
-                    ssh_password = server.get('password', '')
-                    ssh_port = server.get('port', 22)
-                    
-                    if ssh_host and ssh_username and ssh_password:
-                        self.append_chat_message("SYSTEM", f"Auto-connecting to {last_server}...", "system")
-                        
-                        def connect_thread():
-                            self.ssh_client = SSHClient(ssh_host, ssh_username, ssh_password, port=ssh_port)
-                            success, message = self.ssh_client.connect()
-                            GLib.idle_add(self.on_auto_ssh_complete, success, message, last_server)
-                        
-                        thread = threading.Thread(target=connect_thread, daemon=True)
-                        thread.start()
-                    break
+        server = self._servers_by_name.get(last_server) if last_server else None
+        
+        if server is not None:
+            ssh_host = server.get('host', '')
+            ssh_username = server.get('username', '')
+            ssh_password = server.get('password', '')
+            ssh_port = server.get('port', 22)
+            
+            if ssh_host and ssh_username and ssh_password:
+                self.append_chat_message("SYSTEM", f"Auto-connecting to {last_server}...", "system")
+                
+                def connect_thread():
+                    from ssh_client import SSHClient
+                    self.ssh_client = SSHClient(ssh_host, ssh_username, ssh_password, port=ssh_port)
+                    success, message = self.ssh_client.connect()
+                    _ui(self.on_auto_ssh_complete, success, message, last_server)
+                
+                thread = threading.Thread(target=connect_thread, daemon=True)
+                thread.start()
         
         # Auto-test Ollama connection
         ollama_url = self.saved_settings.get('ollama_url', '')
@@ -2423,12 +2695,11 @@ In a concise (1-4 sentence) plain-text comment, do the following:
             self.append_chat_message("SYSTEM", "Checking Ollama connection...", "system")
             
             def test_thread():
-                client = OllamaClient(host=ollama_url)
+                client = self._get_ollama_client(ollama_url)
                 success, message = client.test_connection()
-                GLib.idle_add(self.on_auto_ollama_complete, success, message)
+                _ui(self.on_auto_ollama_complete, success, message)
             
-            thread = threading.Thread(target=test_thread, daemon=True)
-            thread.start()
+            self._executor.submit(test_thread)
         
         return False
     
@@ -2439,12 +2710,11 @@ In a concise (1-4 sentence) plain-text comment, do the following:
             self.append_chat_message("SYSTEM", "Checking Ollama connection...", "system")
             
             def test_thread():
-                client = OllamaClient(host=ollama_url)
+                client = self._get_ollama_client(ollama_url)
                 success, message = client.test_connection()
-                GLib.idle_add(self.on_auto_ollama_complete, success, message)
+                _ui(self.on_auto_ollama_complete, success, message)
             
-            thread = threading.Thread(target=test_thread, daemon=True)
-            thread.start()
+            self._executor.submit(test_thread)
         
         return False
     
@@ -2494,6 +2764,10 @@ class AITerminalApp(Adw.Application):
     
     def on_quit(self, action, param):
         """Quit the application"""
+        # quit() alone skips close-request; close the windows first so each
+        # flushes its debounced settings write
+        for win in list(self.get_windows()):
+            win.close()
         self.quit()
     
     def on_about(self, action, param):
@@ -2,6 +2,8 @@
 Ollama Client for AI Terminal Desktop
 """
 
+import json
+
 import requests
 
 
@@ -9,6 +11,8 @@ class OllamaClient:
     def __init__(self, host='http://localhost:11434', model='llama2'):
         self.host = host.rstrip('/')
         self.model = model
+        # Reuse one HTTP connection (keep-alive) for all requests to this host
+        self.session = requests.Session()
     
     def generate(self, prompt, stream=False):
         """Generate a response from Ollama"""
@@ -20,7 +24,7 @@ class OllamaClient:
                 "stream": stream
             }
             
-            response = requests.post(url, json=payload, timeout=300)
+            response = self.session.post(url, json=payload, timeout=300)
             response.raise_for_status()
             
             if stream:
@@ -31,11 +35,42 @@ class OllamaClient:
         except Exception as e:
             return False, str(e)
     
+    def generate_stream(self, prompt, on_token):
+        """Generate a response from Ollama, passing each token to on_token as it
+        arrives. Returns (success, full_response) like generate()."""
+        try:
+            url = f"{self.host}/api/generate"
+            payload = {
+                "model": self.model,
+                "prompt": prompt,
+                "stream": True
+            }
+            
+            parts = []
+            with self.session.post(url, json=payload, timeout=300, stream=True) as response:
+                response.raise_for_status()
+                # One JSON object per line; the last one has "done": true
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if 'error' in data:
+                        return False, data['error']
+                    token = data.get('response', '')
+                    if token:
+                        parts.append(token)
+                        on_token(token)
+                    if data.get('done'):
+                        break
+            return True, ''.join(parts)
+        except Exception as e:
+            return False, str(e)
+    
     def list_models(self):
         """List available models"""
         try:
             url = f"{self.host}/api/tags"
-            response = requests.get(url, timeout=10)
+            response = self.session.get(url, timeout=10)
             response.raise_for_status()
             data = response.json()
             return True, data.get('models', [])
@@ -46,7 +81,7 @@ class OllamaClient:
         """Test connection to Ollama"""
         try:
             url = f"{self.host}/api/tags"
-            response = requests.get(url, timeout=5)
+            response = self.session.get(url, timeout=5)
             response.raise_for_status()
             return True, "Connected"
         except Exception as e:
@@ -0,0 +1,96 @@
+"""
+AI Response Cache for AI Terminal Desktop
+"""
+
+import dbm
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+
+class ResponseCache:
+    def __init__(self, expire=86400, max_entries=500):
+        # Use XDG cache directory
+        cache_dir = os.getenv('XDG_CACHE_HOME',
+                              os.path.join(Path.home(), '.cache'))
+        self.cache_path = os.path.join(cache_dir, 'aiterminal-desktop')
+        self.cache_file = os.path.join(self.cache_path, 'ai_responses')
+        self.expire = expire  # Seconds an entry stays valid
+        self.max_entries = max_entries  # Oldest entries are evicted beyond this
+        self.lock = threading.Lock()  # Guards the shared dbm handle
+        self._db = None  # Opened on first use, kept until close()
+
+        # Create cache directory if it doesn't exist
+        os.makedirs(self.cache_path, exist_ok=True)
+
+    @staticmethod
+    def make_key(model, prompt):
+        """Build the cache key for a (model, prompt) pair"""
+        return hashlib.sha256(f"{model}|{prompt}".encode('utf-8')).hexdigest()
+
+    def _open(self):
+        """Return the dbm handle, opening it if needed; call with the lock held"""
+        if self._db is None:
+            self._db = dbm.open(self.cache_file, 'c')
+        return self._db
+
+    def get(self, key):
+        """Return the cached response for key, or None if missing or expired"""
+        try:
+            with self.lock:
+                db = self._open()
+                raw = db.get(key)
+                if raw is None:
+                    return None
+                entry = json.loads(raw)
+                if time.time() - entry['time'] > self.expire:
+                    del db[key]
+                    return None
+                return entry['response']
+        except Exception as e:
+            print(f'Error reading response cache: {e}')
+            return None
+
+    def set(self, key, response):
+        """Store a response under key, pruning the cache once it is over its cap"""
+        try:
+            now = time.time()
+            entry = json.dumps({'time': now, 'response': response})
+            with self.lock:
+                db = self._open()
+                db[key] = entry
+                if len(db) > self.max_entries:
+                    self._prune(db, now)
+            return True
+        except Exception as e:
+            print(f'Error writing response cache: {e}')
+            return False
+
+    def _prune(self, db, now):
+        """Drop expired entries, then the oldest ones, leaving some headroom
+        below the cap so the scan doesn't rerun on every set"""
+        stamped = []
+        for key in db.keys():
+            try:
+                stamp = json.loads(db[key])['time']
+            except (ValueError, KeyError, TypeError):
+                stamp = 0  # Unreadable entries go first
+            if now - stamp > self.expire:
+                del db[key]
+            else:
+                stamped.append((stamp, key))
+        excess = len(stamped) - (self.max_entries - self.max_entries // 10)
+        if excess > 0:
+            stamped.sort()
+            for _, key in stamped[:excess]:
+                del db[key]
+
+    def close(self):
+        """Close the dbm handle; it is reopened if the cache is used again"""
+        with self.lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -3,10 +3,37 @@ SSH Client for AI Terminal Desktop
 """
 
 import paramiko
+import codecs
 import shlex
 import re
 import os
-import time
+import queue
+import threading
+
+from local_client import PLAIN_WORD_RE
+
+# Bytes requested per channel recv(); large reads mean fewer calls on big output
+RECV_SIZE = 65536
+
+# Bounds for the adaptive recv() size used when streaming: it doubles while reads
+# come back full and halves when they come back mostly empty
+RECV_MIN = 4096
+RECV_MAX = 262144
+
+# Splits a command line on ; and &&, keeping the separators
+_CMD_SPLIT_RE = re.compile(r'(;|&&)')
+
+# Line that ends each reply from the completion shell
+_COMPLETION_SENTINEL = '__AITERM_END__'
+
+
+def _read_capped(stream, max_bytes):
+    """Read stream to EOF, keeping only the first max_bytes bytes"""
+    data = stream.read(max_bytes)
+    # Keep draining past the cap so the remote command isn't blocked on a full window
+    while stream.read(RECV_SIZE):
+        pass
+    return data
 
 
 class SSHClient:
@@ -19,7 +46,11 @@ class SSHClient:
         self.client = None
         self.connected = False
         self.current_directory = None  # Track current working directory
+        self._remote_cwd = None  # Directory every new exec channel starts in (the login dir)
         self.running_channel = None  # Track currently running command channel
+        self._remote_commands = None  # Sorted command names on the server, per connection
+        self._completion_channel = None  # Persistent bash answering completion queries
+        self._completion_lock = threading.Lock()
         
     def connect(self):
         """Connect to SSH server"""
@@ -27,13 +58,19 @@ class SSHClient:
             self.client = paramiko.SSHClient()
             self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
             
+            # With explicit credentials, skip the agent and the ~/.ssh key scan;
+            # each would be tried (and fail) before the configured credential
+            search_keys = not (self.key_file or self.password)
+            
             if self.key_file:
                 self.client.connect(
                     self.host, 
                     port=self.port, 
                     username=self.username, 
                     key_filename=self.key_file, 
-                    timeout=10
+                    timeout=10,
+                    allow_agent=search_keys,
+                    look_for_keys=search_keys
                 )
             else:
                 self.client.connect(
@@ -41,29 +78,38 @@ class SSHClient:
                     port=self.port, 
                     username=self.username, 
                     password=self.password, 
-                    timeout=10
+                    timeout=10,
+                    allow_agent=search_keys,
+                    look_for_keys=search_keys
                 )
             
             self.connected = True
+            self._remote_commands = None
+            self._completion_channel = None
+            # Keep the connection (and the idle completion channel) alive through NAT
+            self.client.get_transport().set_keepalive(30)
             
             # Get initial working directory
             try:
                 stdin, stdout, stderr = self.client.exec_command('pwd')
-                self.current_directory = stdout.read().decode('utf-8').strip()
+                self.current_directory = stdout.read().decode('utf-8', errors='replace').strip()
             except:
                 self.current_directory = None
+            self._remote_cwd = self.current_directory
             
             return True, "Connected successfully"
         except Exception as e:
             return False, str(e)
     
-    def execute_command(self, command, output_callback=None, timeout=None):
+    def execute_command(self, command, output_callback=None, timeout=None, max_bytes=None):
         """Execute a command on the SSH server with optional streaming output.
         
         Args:
             command: Command to execute
             output_callback: Optional callback function(text) called for each chunk of output
             timeout: Optional timeout (not used in streaming mode)
+            max_bytes: Optional cap on the output kept in non-streaming mode; the
+                rest is read and discarded, so the command still runs to the end
         
         Returns:
             (success, output) tuple
@@ -75,25 +121,17 @@ class SSHClient:
             base_dir = self.current_directory
             
             def split_commands(cmd):
-                parts = re.split(r'(;|&&)', cmd)
-                result = []
-                buf = ''
-                for part in parts:
-                    if part in (';', '&&'):
-                        if buf.strip():
-                            result.append(buf.strip())
-                        result.append(part)
-                        buf = ''
-                    else:
-                        buf += part
-                if buf.strip():
-                    result.append(buf.strip())
-                return result
+                # split() alternates command, separator, command, ...; keep every
+                # separator and every non-blank command
+                parts = _CMD_SPLIT_RE.split(cmd)
+                return [part if i % 2 else part.strip()
+                        for i, part in enumerate(parts) if i % 2 or part.strip()]
 
             # Track directory changes for all cd commands in the chain
             last_dir = base_dir
             cmds = split_commands(command)
             only_cd = True
+            cd_targets = []
             
             for part in cmds:
                 if part in (';', '&&'):
@@ -102,32 +140,18 @@ class SSHClient:
                     try:
                         cd_parts = shlex.split(part)
                         if len(cd_parts) >= 2:
-                            cd_target = cd_parts[1]
-                            if last_dir:
-                                exec_cmd = f'cd {shlex.quote(last_dir)} && cd {shlex.quote(cd_target)} && pwd'
-                                stdin, stdout, stderr = self.client.exec_command(exec_cmd)
-                                output = stdout.read().decode('utf-8')
-                                error = stderr.read().decode('utf-8')
-                                if output and not error:
-                                    last_dir = output.strip().splitlines()[-1]
-                                else:
-                                    last_dir = os.path.normpath(os.path.join(last_dir, cd_target))
-                                    break
-                            else:
-                                exec_cmd = f'cd {shlex.quote(cd_target)} && pwd'
-                                stdin, stdout, stderr = self.client.exec_command(exec_cmd)
-                                output = stdout.read().decode('utf-8')
-                                error = stderr.read().decode('utf-8')
-                                if output and not error:
-                                    last_dir = output.strip().splitlines()[-1]
-                                else:
-                                    last_dir = os.path.normpath(cd_target)
-                                    break
+                            cd_targets.append(cd_parts[1])
                     except Exception:
                         pass
                 else:
                     only_cd = False
             
+            if cd_targets:
+                try:
+                    last_dir = self._resolve_cd_chain(base_dir, cd_targets)
+                except Exception:
+                    pass
+            
             # Update tracked directory
             if last_dir:
                 self.current_directory = last_dir
@@ -136,8 +160,9 @@ class SSHClient:
             if only_cd and len(cmds) == 1 and cmds[0].startswith('cd '):
                 return True, last_dir
             
-            # Build the full command
-            if self.current_directory:
+            # Build the full command. Each exec_command starts a fresh shell in the
+            # login directory, so the cd is only needed once the user has left it
+            if self.current_directory and self.current_directory != self._remote_cwd:
                 full_command = f'cd {shlex.quote(self.current_directory)} && {command}'
             else:
                 full_command = command
@@ -147,15 +172,41 @@ class SSHClient:
                 return self._execute_streaming(full_command, output_callback)
             
             # Non-streaming mode (original behavior)
+            # Read raw bytes and decode only the stream that is returned
             stdin, stdout, stderr = self.client.exec_command(full_command)
-            output = stdout.read().decode('utf-8')
-            error = stderr.read().decode('utf-8')
+            if max_bytes is None:
+                output = stdout.read()
+                error = stderr.read()
+            else:
+                output = _read_capped(stdout, max_bytes)
+                error = _read_capped(stderr, max_bytes)
             result = output if output else error
-            return True, result
+            return True, result.decode('utf-8', errors='replace')
             
         except Exception as e:
             return False, str(e)
     
+    def _resolve_cd_chain(self, base_dir, cd_targets):
+        """Resolve where a chain of cd commands ends up, in one round-trip.
+        
+        Prints pwd after every cd, so if one fails the lines show how far the
+        chain got; that cd's target is then resolved locally instead.
+        """
+        steps = [f'cd {shlex.quote(base_dir)}'] if base_dir else []
+        steps.extend(f'cd {shlex.quote(target)} && pwd' for target in cd_targets)
+        stdin, stdout, stderr = self.client.exec_command(' && '.join(steps))
+        resolved = stdout.read().decode('utf-8', errors='replace').splitlines()
+        error = stderr.read()
+        
+        if len(resolved) >= len(cd_targets) and not error:
+            return resolved[-1].strip()
+        
+        failed = min(len(resolved), len(cd_targets) - 1)
+        previous = resolved[failed - 1].strip() if failed else base_dir
+        if previous:
+            return os.path.normpath(os.path.join(previous, cd_targets[failed]))
+        return os.path.normpath(cd_targets[failed])
+    
     def _execute_streaming(self, command, output_callback):
         """Execute command with streaming output over SSH"""
         try:
@@ -164,38 +215,34 @@ class SSHClient:
             self.running_channel.get_pty()  # Request PTY for interactive commands
             self.running_channel.exec_command(command)
             
-            all_output = []
+            channel = self.running_channel
+            all_output = bytearray()  # Raw output, decoded once at the end
+            # Only the text handed to the callback is decoded per chunk; the
+            # decoder carries characters split across reads over
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
             
-            # Read output in chunks
-            while True:
-                if self.running_channel.recv_ready():
-                    chunk = self.running_channel.recv(4096).decode('utf-8', errors='replace')
-                    if chunk:
-                        all_output.append(chunk)
-                        output_callback(chunk)
-                
-                if self.running_channel.recv_stderr_ready():
-                    chunk = self.running_channel.recv_stderr(4096).decode('utf-8', errors='replace')
-                    if chunk:
-                        all_output.append(chunk)
-                        output_callback(chunk)
-                
-                # Check if command has finished
-                if self.running_channel.exit_status_ready():
-                    # Read any remaining output
-                    while self.running_channel.recv_ready():
-                        chunk = self.running_channel.recv(4096).decode('utf-8', errors='replace')
-                        if chunk:
-                            all_output.append(chunk)
-                            output_callback(chunk)
-                    break
-                
-                time.sleep(0.05)  # Small delay to avoid busy loop
+            # A reader thread keeps the channel drained however long the callback
+            # takes; chunks are handed over through the queue
+            chunks = queue.SimpleQueue()
+            errors = []
+            threading.Thread(target=self._read_channel, args=(channel, chunks, errors),
+                             daemon=True).start()
+            while (data := chunks.get()) is not None:
+                all_output.extend(data)
+                chunk = decoder.decode(data)
+                if chunk:
+                    output_callback(chunk)
+            if errors:
+                raise errors[0]
+            
+            chunk = decoder.decode(b'', final=True)
+            if chunk:
+                output_callback(chunk)
             
-            self.running_channel.close()
+            channel.close()
             self.running_channel = None
             
-            return True, ''.join(all_output)
+            return True, all_output.decode('utf-8', errors='replace')
             
         except Exception as e:
             if self.running_channel:
@@ -206,6 +253,54 @@ class SSHClient:
                 self.running_channel = None
             return False, str(e)
     
+    def _read_channel(self, channel, chunks, errors):
+        """Put the channel's output into chunks as it arrives, then None; any
+        exception is appended to errors for the consumer to raise"""
+        size = RECV_MIN
+        
+        def take(data):
+            nonlocal size
+            if len(data) == size and size < RECV_MAX:
+                size *= 2
+            elif len(data) < size // 4 and size > RECV_MIN:
+                size //= 2
+            chunks.put(data)
+        
+        try:
+            # Paramiko sets this event whenever data lands in (or EOF closes) either
+            # of the channel's buffers, so the thread sleeps until there is work.
+            # Reading a buffer empty clears it, so only wait if both are empty; the
+            # timeout only bounds how long an exit without output goes unnoticed
+            event = threading.Event()
+            channel.in_buffer.set_event(event)
+            channel.in_stderr_buffer.set_event(event)
+            while True:
+                if not (channel.recv_ready() or channel.recv_stderr_ready()):
+                    if channel.eof_received:
+                        # The buffers are closed, which leaves the event set for
+                        # good; wait for the exit status instead
+                        channel.status_event.wait(0.5)
+                    else:
+                        event.wait(0.5)
+                event.clear()
+                
+                while channel.recv_ready():
+                    take(channel.recv(size))
+                
+                while channel.recv_stderr_ready():
+                    take(channel.recv_stderr(size))
+                
+                # Check if command has finished (or was killed)
+                if channel.exit_status_ready() or channel.closed:
+                    # Read any remaining output
+                    while channel.recv_ready():
+                        take(channel.recv(size))
+                    break
+        except Exception as e:
+            errors.append(e)
+        finally:
+            chunks.put(None)
+    
     def interrupt_command(self):
         """Send interrupt signal (Ctrl+C) to running command"""
         if self.running_channel:
@@ -228,33 +323,86 @@ class SSHClient:
                 pass
         return False
     
+    def _completion_query(self, script, timeout=5):
+        """Run a bash script on the persistent completion channel and return its raw output.
+        
+        The channel is opened on first use and reused, so a Tab press costs one
+        round-trip instead of opening and closing a channel each time.
+        """
+        with self._completion_lock:
+            channel = self._completion_channel
+            try:
+                if channel is None or channel.closed or channel.exit_status_ready():
+                    channel = self.client.get_transport().open_session()
+                    channel.exec_command('exec bash --noprofile --norc')
+                    channel.settimeout(timeout)
+                    self._completion_channel = channel
+                
+                channel.sendall(f"{script}; echo {_COMPLETION_SENTINEL}\n".encode())
+                end = f"{_COMPLETION_SENTINEL}\n".encode()
+                data = bytearray()
+                while not data.endswith(end):
+                    chunk = channel.recv(RECV_SIZE)
+                    if not chunk:
+                        raise EOFError("completion shell exited")
+                    data += chunk
+            except Exception:
+                # Open a fresh channel on the next query
+                if channel is not None:
+                    channel.close()
+                self._completion_channel = None
+                raise
+        return bytes(data[:-len(end)])
+    
+    def _get_remote_commands(self):
+        """Return the server's command names as bytes, listed once per connection"""
+        if self._remote_commands is None:
+            names = self._completion_query('compgen -c 2>/dev/null').split()
+            self._remote_commands = tuple(sorted(set(names)))
+        return self._remote_commands
+    
     def get_completions(self, partial_text):
         """Get bash tab completions for partial text"""
         try:
             if not self.connected or not self.client:
                 return []
             
-            # Escape special characters
-            escaped_text = partial_text.replace("'", "'\\''")
+            # Plain words match cached command names, so the server only has to
+            # list files; anything else gets the full compgen
+            plain = bool(PLAIN_WORD_RE.match(partial_text))
+            actions = "-f" if plain else "-f -c"
             
             # Use bash's compgen for completion
+            script = f"compgen {actions} -- {shlex.quote(partial_text)} 2>/dev/null"
             if self.current_directory:
-                completion_cmd = f"cd {self.current_directory} && bash -c \"compgen -f -c -- '{escaped_text}' 2>/dev/null\""
-            else:
-                completion_cmd = f"bash -c \"compgen -f -c -- '{escaped_text}' 2>/dev/null\""
+                script = f"cd -- {shlex.quote(self.current_directory)} 2>/dev/null && {script}"
+            
+            # Work on bytes throughout and decode only the candidates returned
+            matches = []
+            if plain:
+                prefix = partial_text.encode('utf-8')
+                matches = [c for c in self._get_remote_commands() if c.startswith(prefix)]
             
-            stdin, stdout, stderr = self.client.exec_command(completion_cmd)
-            output = stdout.read().decode('utf-8')
+            output = self._completion_query(script)
             
             if output:
-                completions = [line.strip() for line in output.split('\n') if line.strip()]
-                return completions
-            return []
+                seen = set(matches)
+                for line in output.split(b'\n'):
+                    line = line.strip()
+                    if line and line not in seen:
+                        matches.append(line)
+            return [m.decode('utf-8', errors='replace') for m in matches]
         except Exception as e:
             return []
     
     def disconnect(self):
         """Disconnect from SSH server"""
+        if self._completion_channel is not None:
+            try:
+                self._completion_channel.close()
+            except Exception:
+                pass
+            self._completion_channel = None
         if self.client:
             self.client.close()
             self.connected = False
@@ -0,0 +1,49 @@
+import pytest
+
+from ai_response import parse_ai_response
+
+
+def baseline_parse(response):
+    """Line-by-line parser the regex version replaced"""
+    lines = response.strip().split('\n')
+    command = "NONE"
+    ai_message = ""
+    response_started = False
+
+    for line in lines:
+        if line.startswith("COMMAND:"):
+            command = line.replace("COMMAND:", "").strip()
+            response_started = False
+        elif line.startswith("RESPONSE:"):
+            ai_message = line.replace("RESPONSE:", "").strip()
+            response_started = True
+        elif response_started:
+            ai_message += "\n" + line
+
+    return command, ai_message
+
+
+@pytest.mark.parametrize("response", [
+    "COMMAND: ls\nRESPONSE: ok",
+    " COMMAND: ls\nRESPONSE: ok",
+    "\n\n  COMMAND: ls -la\nRESPONSE: lists files\n",
+    "COMMAND: NONE\nRESPONSE: hello\nsecond line\n  indented third",
+    "COMMAND: ls\nRESPONSE: first\nCOMMAND: pwd\nRESPONSE: second",
+    "COMMAND: ls\nRESPONSE: first\nmore\nCOMMAND: pwd",
+    "RESPONSE: a\n\nCOMMAND: x\ntrailing",
+    "RESPONSE: one\nRESPONSE: two\ncontinued",
+    "Sure!\nCOMMAND: df -h\nRESPONSE: disk usage",
+    "COMMAND: echo COMMAND: twice\nRESPONSE: RESPONSE: twice",
+    "COMMAND:\nRESPONSE:",
+    "just chatting",
+    "",
+])
+def test_matches_baseline(response):
+    parse_ai_response.cache_clear()
+    assert parse_ai_response(response) == baseline_parse(response)
+
+
+def test_indented_field_lines():
+    assert parse_ai_response("  COMMAND: ls\n\tRESPONSE: ok") == ("ls", "ok")
+    assert parse_ai_response("RESPONSE: a\n  COMMAND: pwd") == ("pwd", "a")
+    assert parse_ai_response(" COMMAND: ls\n  RESPONSE: ok\nmore\n") == ("ls", "ok\nmore")
@@ -0,0 +1,25 @@
+from local_client import LocalClient
+
+
+def test_max_bytes_keeps_running_past_the_cap(tmp_path):
+    marker = tmp_path / 'after'
+    ok, output = LocalClient().execute_command(
+        f"echo step1; sleep 0.3; touch {marker}; echo done", max_bytes=4)
+    assert (ok, output) == (True, 'step')
+    assert marker.exists()
+
+
+def test_max_bytes_drains_large_output():
+    ok, output = LocalClient().execute_command(
+        "head -c 3000000 /dev/zero | tr '\\0' a; echo err >&2", max_bytes=10)
+    assert (ok, output) == (True, 'a' * 10)
+
+
+def test_max_bytes_appends_stderr():
+    assert LocalClient().execute_command("echo hi; echo err >&2", max_bytes=100) == (True, 'hi\nerr\n')
+
+
+def test_timeout_reports_failure():
+    ok, output = LocalClient().execute_command("echo x; sleep 5", timeout=1, max_bytes=10)
+    assert not ok
+    assert 'timed out' in output
@@ -0,0 +1,73 @@
+import types
+
+import pytest
+
+import response_cache
+from response_cache import ResponseCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache, 'time', types.SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def make_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    caches = []
+
+    def make(**kwargs):
+        cache = ResponseCache(**kwargs)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        cache.close()
+
+
+def test_roundtrip(make_cache, clock):
+    cache = make_cache()
+    key = ResponseCache.make_key('llama3', 'list files')
+    assert cache.get(key) is None
+    assert cache.set(key, 'COMMAND: ls\nRESPONSE: ok')
+    assert cache.get(key) == 'COMMAND: ls\nRESPONSE: ok'
+
+
+def test_persists_across_instances(make_cache, clock):
+    cache = make_cache()
+    cache.set('k', 'v')
+    cache.close()
+    assert make_cache().get('k') == 'v'
+
+
+def test_expired_entry_is_dropped(make_cache, clock):
+    cache = make_cache(expire=60)
+    cache.set('k', 'v')
+    clock[0] += 61
+    assert cache.get('k') is None
+    clock[0] -= 61
+    assert cache.get('k') is None  # Deleted, not just hidden
+
+
+def test_evicts_oldest_beyond_cap(make_cache, clock):
+    cache = make_cache(max_entries=10)
+    for i in range(11):
+        cache.set(f'k{i}', str(i))
+        clock[0] += 1
+    # Pruned down to 90% of the cap, oldest first
+    assert [cache.get(f'k{i}') for i in range(11)] == [None, None] + [str(i) for i in range(2, 11)]
+
+
+def test_prune_drops_expired_before_fresh(make_cache, clock):
+    cache = make_cache(expire=100, max_entries=4)
+    for i in range(3):
+        cache.set(f'old{i}', 'x')
+    clock[0] += 101
+    cache.set('new0', 'a')
+    cache.set('new1', 'b')
+    with cache.lock:
+        assert sorted(cache._open().keys()) == [b'new0', b'new1']
+    assert cache.get('new0') == 'a' and cache.get('new1') == 'b'